@@ -14,6 +14,7 @@ class Settings(BaseSettings):
 
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
+    TAGS_MODEL: str = "gpt-4o-mini"
 
     # Net2Phone
     NET2PHONE_SECRET: Optional[str] = None
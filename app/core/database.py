@@ -1,4 +1,5 @@
 import os
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from functools import wraps
@@ -17,7 +18,17 @@ SessionLocal = None
 if db_url:
     engine = create_engine(
         db_url,
-        connect_args={"options": "-csearch_path=public"}
+        connect_args={"options": "-csearch_path=public"},
+        query_cache_size=1200,
+        # Survive DB restarts/network blips without sporadic 500s, and reuse the
+        # most recently returned connection first (warm server-side caches).
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+        pool_size=20,
+        max_overflow=30,
+        pool_recycle=1800,
+        json_serializer=lambda obj: orjson.dumps(obj).decode(),
+        json_deserializer=orjson.loads,
     )
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,31 @@
+"""
+Shared OpenAI client for the application.
+"""
+import logging
+import httpx
+from openai import OpenAI
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# One connection pool per process, shared by every OpenAI-backed service, so
+# TLS connections to OpenAI stay alive across calls instead of handshaking on
+# each one.
+http_client = httpx.Client(
+    limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+    timeout=httpx.Timeout(60.0)
+)
+
+# The SDK retries 429, 408/409, 5xx and connection errors with jittered
+# exponential backoff (honouring Retry-After); auth and not-found errors fail
+# fast.
+client = OpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    max_retries=3,
+    timeout=60.0,
+    http_client=http_client
+) if settings.OPENAI_API_KEY else None
+if client is None:
+    logger.warning("OPENAI_API_KEY is not set; OpenAI-backed endpoints are disabled")
@@ -0,0 +1,16 @@
+from itertools import chain
+from typing import List
+
+
+def sample_segments(segments: List, head: int = 40, middle: int = 20, tail: int = 40) -> List:
+    """
+    Sample a long transcription from its beginning, middle and end.
+    Transcriptions with head + middle + tail segments or fewer are returned as-is.
+    The sample is built by index in one pass (no intermediate slice copies).
+    """
+    n = len(segments)
+    if n <= head + middle + tail:
+        return segments
+    mid = n // 2 - middle // 2
+    indices = chain(range(head), range(mid, mid + middle), range(n - tail, n))
+    return [segments[i] for i in indices]
@@ -1,5 +1,6 @@
 from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi_mcp import AuthConfig, FastApiMCP
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
@@ -40,6 +41,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Gzip JSON responses (transcripts, analyses, chat history compress several
+# times over) for clients sending Accept-Encoding: gzip. Starlette skips
+# audio/* and text/event-stream, so audio downloads and MCP SSE pass through.
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
 # OAuth 2.0 endpoints — sin auth dependency
 app.include_router(oauth_router)
 
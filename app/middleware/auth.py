@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime
 from typing import Optional
 
@@ -54,7 +55,6 @@ def _load_key_by_id(key_id: int) -> ApiKeyData:
 
 def _load_key_by_raw_value(raw_key: str) -> Optional[ApiKeyData]:
     """Carga un API key desde la DB por su valor crudo (hashing) y actualiza last_used_at."""
-    import hashlib
     hashed_key = hashlib.sha256(raw_key.encode()).hexdigest()
     db: Session = SessionLocal()
     try:
@@ -2,6 +2,7 @@ from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from datetime import datetime
 from .task import Base
 import hashlib
+import hmac
 import secrets
 
 class GlobalApiKey(Base):
@@ -17,5 +18,5 @@ class GlobalApiKey(Base):
 
     @staticmethod
     def verify_key(plain_key: str, hashed_key: str) -> bool:
-        """Verifies if a plain key matches the hash."""
-        return hashlib.sha256(plain_key.encode()).hexdigest() == hashed_key
+        """Verifies if a plain key matches the hash (constant-time comparison)."""
+        return hmac.compare_digest(hashlib.sha256(plain_key.encode()).hexdigest(), hashed_key)
@@ -5,7 +5,7 @@ from slowapi.util import get_remote_address
 from app.core.database import get_db
 from app.models import GlobalApiKey
 from app.middleware.auth import get_api_key
-from app.schemas.audit import AuditRequest, AuditResponse
+from app.schemas.audit import AuditRequest, AuditBatchRequest, AuditResponse
 
 router = APIRouter(prefix="/audit", tags=["Audit"], dependencies=[Depends(get_api_key)])
 limiter = Limiter(key_func=get_remote_address)
@@ -27,7 +27,26 @@ def generate_audit(audit_req: AuditRequest, request: Request, db: Session = Depe
         else:
             result = AuditService.generate_audit_for_chat(db, audit_req.task_uuid)
         if not result.get("success"):
-            raise HTTPException(status_code=400, detail=result)
+            raise HTTPException(status_code=result.pop("status_code", 400), detail=result)
         return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail={"code": "ERROR", "message": str(e)})
+
+
+@router.post(
+    "/regenerate",
+    summary="Regenerate quality audits for several calls",
+    description="Generates the audits of up to 50 call tasks again, overwriting the existing ones. "
+                "OpenAI calls run concurrently; the response lists one result per task_uuid, in request order. "
+                "Tasks that do not exist or belong to another API key are reported as not found.",
+)
+@limiter.limit("2/minute")
+def regenerate_audits(batch_req: AuditBatchRequest, request: Request, db: Session = Depends(get_db), api_key: GlobalApiKey = Depends(get_api_key)):
+    from app.services.audit_service import AuditService
+    try:
+        results = AuditService.regenerate_audits_batch(db, batch_req.task_uuids, api_key.id)
+        return {"success": True, "results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail={"code": "ERROR", "message": str(e)})
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
+import threading
 from typing import List
+from cachetools import TTLCache
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -17,6 +19,12 @@ router = APIRouter(
 
 limiter = Limiter(key_func=get_remote_address)
 
+# Campaigns change rarely and are managed from the Backend service; a short
+# TTL keeps the list fresh enough while sparing the query on every call.
+_campaigns_cache: TTLCache = TTLCache(maxsize=1, ttl=30)
+# TTLCache is not thread-safe and this sync route runs on the threadpool
+_campaigns_lock = threading.Lock()
+
 @router.get("/", response_model=List[CampaignSummary])
 @limiter.limit("20/minute")
 def list_campaigns(
@@ -27,4 +35,10 @@ def list_campaigns(
     """
     List all available campaigns.
     """
-    return db.query(Campaign).all()
+    with _campaigns_lock:
+        campaigns = _campaigns_cache.get("all")
+    if campaigns is None:
+        campaigns = [CampaignSummary.model_validate(c) for c in db.query(Campaign).all()]
+        with _campaigns_lock:
+            _campaigns_cache["all"] = campaigns
+    return campaigns
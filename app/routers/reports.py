@@ -49,8 +49,7 @@ def get_audit_stats(request: Request, days: int = Query(30), db: Session = Depen
 def get_summary(request: Request, days: int = Query(30), db: Session = Depends(get_db), api_key: GlobalApiKey = Depends(get_api_key)):
     try:
         from datetime import datetime
-        task_stats = ReportsService.get_task_stats(db, days)
-        audit_stats = ReportsService.get_audit_stats(db, days)
-        return {"tasks": task_stats, "audits": audit_stats, "generated_at": datetime.utcnow()}
+        stats = ReportsService.get_combined_stats(db, days)
+        return {**stats, "generated_at": datetime.utcnow()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
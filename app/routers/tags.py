@@ -5,7 +5,7 @@ from slowapi.util import get_remote_address
 from app.core.database import get_db
 from app.models import GlobalApiKey
 from app.middleware.auth import get_api_key
-from app.schemas.tags import TagsResponse
+from app.schemas.tags import TagsResponse, TagsBulkRequest
 
 router = APIRouter(prefix="/tags", tags=["Tags"], dependencies=[Depends(get_api_key)])
 limiter = Limiter(key_func=get_remote_address)
@@ -31,3 +31,20 @@ def get_tags(request: Request, task_uuid: str, generate_new: bool = Query(False)
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/bulk",
+    summary="Generate tags for several tasks",
+    description="Generates (or regenerates) the tags of up to 50 tasks in one request. "
+                "OpenAI calls run concurrently; the response lists one result per task_uuid, in request order. "
+                "Tasks that do not exist or belong to another API key are reported as not found.",
+)
+@limiter.limit("2/minute")
+def generate_tags_bulk(bulk_req: TagsBulkRequest, request: Request, db: Session = Depends(get_db), api_key: GlobalApiKey = Depends(get_api_key)):
+    from app.services.tags_service import TagsService
+    try:
+        results = TagsService.generate_tags_bulk(db, bulk_req.task_uuids, api_key.id)
+        return {"success": True, "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
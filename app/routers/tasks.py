@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import text, cast, Text
-from typing import List, Optional
+from typing import Dict, List, Optional
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from app.core.database import get_db
 from app.models import Task, GlobalApiKey
 from app.middleware.auth import get_api_key
-from app.schemas import TaskSimple, Result, Metadata
+from app.schemas import TaskSimple, Result, Metadata, TasksBulkRequest
 from app.core.config import get_settings
 
 router = APIRouter(
@@ -19,6 +19,23 @@ router = APIRouter(
 
 limiter = Limiter(key_func=get_remote_address)
 
+def _to_result(task: Task) -> Result:
+    meta = Metadata(
+        task_type=task.task_type or "unknown",
+        task_params=task.task_params,
+        language=task.language,
+        file_name=task.file_name,
+        url=task.url,
+        duration=task.duration,
+        audio_duration=task.audio_duration
+    )
+    return Result(
+        status=task.status,
+        result=task.result,
+        metadata=meta,
+        error=task.error
+    )
+
 @router.get(
     "/",
     response_model=List[TaskSimple],
@@ -60,6 +77,30 @@ def list_tasks(
         
     return tasks
 
+@router.post(
+    "/bulk",
+    response_model=Dict[str, Result],
+    summary="Get several tasks at once",
+    description="Returns the full details of up to 100 tasks in one request, keyed by task UUID. "
+                "UUIDs that do not exist or belong to another API key are omitted from the response.",
+)
+@limiter.limit("60/minute")
+def get_tasks_bulk(
+    bulk_req: TasksBulkRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    api_key: GlobalApiKey = Depends(get_api_key)
+):
+    """
+    Get detailed status and results of several tasks with a single query.
+    """
+    tasks = db.query(Task).filter(
+        Task.uuid.in_(bulk_req.uuids),
+        cast(Task.task_params['api_key_id'], Text) == str(api_key.id)
+    ).all()
+
+    return {task.uuid: _to_result(task) for task in tasks}
+
 @router.get(
     "/{task_uuid}",
     response_model=Result,
@@ -85,23 +126,7 @@ def get_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Construct Metadata
-    meta = Metadata(
-        task_type=task.task_type or "unknown",
-        task_params=task.task_params,
-        language=task.language,
-        file_name=task.file_name,
-        url=task.url,
-        duration=task.duration,
-        audio_duration=task.audio_duration
-    )
-    
-    return Result(
-        status=task.status,
-        result=task.result,
-        metadata=meta,
-        error=task.error
-    )
+    return _to_result(task)
 
 @router.get(
     "/{task_uuid}/audio",
@@ -134,8 +159,8 @@ async def get_task_audio(
     object_key = task.url 
     
     try:
-        from app.services.s3_service import get_s3_object
-        s3_obj = get_s3_object(bucket_name, object_key)
+        from app.services.s3_service import get_s3_object_if_exists
+        s3_obj = get_s3_object_if_exists(bucket_name, object_key)
         
         if not s3_obj:
              raise HTTPException(status_code=404, detail="Audio file not found in storage")
@@ -149,6 +174,8 @@ async def get_task_audio(
                 "Content-Disposition": f"attachment; filename={task.file_name}"
             }
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
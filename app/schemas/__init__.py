@@ -1,6 +1,6 @@
-from .task import TaskSimple, Result, Metadata, TaskUpdate, ResultTasks
-from .audit import AuditRequest, AuditResponse
-from .tags import TagsResponse
+from .task import TaskSimple, Result, Metadata, TaskUpdate, ResultTasks, TasksBulkRequest
+from .audit import AuditRequest, AuditBatchRequest, AuditResponse
+from .tags import TagsResponse, TagsBulkRequest
 from .speaker_analysis import SpeakerAnalysisResponse
 from .agent_identification import AgentIdentificationResponse
 from .reports import TaskStatsResponse, AuditStatsResponse, ReportSummaryResponse
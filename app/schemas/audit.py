@@ -20,6 +20,21 @@ class AuditRequest(BaseModel):
         }
 
 
+class AuditBatchRequest(BaseModel):
+    """Request to regenerate audits for several calls."""
+    task_uuids: List[str] = Field(..., min_length=1, max_length=50, description="UUIDs of the call tasks to re-audit")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "task_uuids": [
+                    "075bcc8c-8fe5-11f0-b36d-0242ac110007",
+                    "1a2b3c4d-8fe5-11f0-b36d-0242ac110007"
+                ]
+            }
+        }
+
+
 class AuditItem(BaseModel):
     """Single audit criterion result."""
     id: Optional[int] = None
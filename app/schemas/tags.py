@@ -1,7 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 class TagsResponse(BaseModel):
     success: bool
     tags: List[str]
     extraTags: List[str]
+
+
+class TagsBulkRequest(BaseModel):
+    task_uuids: List[str] = Field(..., min_length=1, max_length=50, description="UUIDs of the tasks to tag")
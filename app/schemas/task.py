@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Any, Dict
 from datetime import datetime
 
@@ -83,6 +83,10 @@ class Result(BaseModel):
             }
         }
 
+class TasksBulkRequest(BaseModel):
+    """Task UUIDs to fetch in one request."""
+    uuids: List[str] = Field(..., min_length=1, max_length=100, description="UUIDs of the tasks to fetch")
+
 class TaskUpdate(BaseModel):
     """Schema for updating task status and result."""
     status: str
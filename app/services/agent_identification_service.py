@@ -2,18 +2,40 @@
 Service for agent identification (simplified for External API).
 """
 import os
-import json
+import orjson
 import logging
 from typing import Dict
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from openai import OpenAI
 
 from app.core.config import get_settings
+from app.core.openai_client import client
+from app.core.transcript import sample_segments
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+_EXISTING_IDENTIFICATION_STMT = text("""
+    SELECT agent_identification
+    FROM agent_identifications
+    WHERE original_uuid = :uuid
+    LIMIT 1
+""")
+_TASK_SEGMENTS_STMT = text("""
+    SELECT uuid,
+           result::jsonb -> 'segments' AS segments,
+           result::jsonb ->> 'language' AS language
+    FROM tasks
+    WHERE uuid = :uuid
+    LIMIT 1
+""")
+_SAVE_IDENTIFICATION_STMT = text("""
+    INSERT INTO agent_identifications (original_uuid, agent_identification, created_at)
+    VALUES (:uuid, CAST(:identification AS jsonb), NOW())
+    ON CONFLICT (original_uuid) DO UPDATE
+    SET agent_identification = EXCLUDED.agent_identification
+""")
 
 
 class AgentIdentificationService:
@@ -32,11 +54,11 @@ class AgentIdentificationService:
         if not task:
             raise ValueError(f"Task {task_uuid} not found")
 
-        if not task.get('result'):
+        if not task.get('segments'):
             raise ValueError("Task has no transcription")
 
         # 3. Identify agents
-        identification = AgentIdentificationService._identify_with_openai(task['result'])
+        identification = AgentIdentificationService._identify_with_openai(task)
 
         # 4. Save
         AgentIdentificationService._save_identification(db, task_uuid, identification)
@@ -46,54 +68,41 @@ class AgentIdentificationService:
     @staticmethod
     def _get_existing_identification(db: Session, task_uuid: str) -> Dict[str, str] | None:
         """Get existing identification."""
-        query = text("""
-            SELECT agent_identification
-            FROM agent_identifications
-            WHERE original_uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).scalar()
+        result = db.execute(_EXISTING_IDENTIFICATION_STMT, {"uuid": task_uuid}).scalar_one_or_none()
         if result:
             if isinstance(result, str):
-                return json.loads(result)
+                return orjson.loads(result)
             return result
         return None
 
     @staticmethod
     def _get_task(db: Session, task_uuid: str) -> Dict | None:
-        """Get task data."""
-        query = text("""
-            SELECT uuid, result
-            FROM tasks
-            WHERE uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).fetchone()
-        if result:
-            result_data = result[1]
-            if isinstance(result_data, str):
-                result_data = json.loads(result_data)
-            return {
-                "uuid": result[0],
-                "result": result_data
-            }
-        return None
+        """
+        Get task data. Only the segments and language are extracted (server-side)
+        from the transcription result, not the whole transcript document.
+        """
+        row = db.execute(_TASK_SEGMENTS_STMT, {"uuid": task_uuid}).mappings().one_or_none()
+        if row is None:
+            return None
+        task = dict(row)
+        if isinstance(task["segments"], str):
+            task["segments"] = orjson.loads(task["segments"])
+        return task
 
     @staticmethod
     def _identify_with_openai(result_data: Dict) -> Dict[str, str]:
         """Identify agents using OpenAI."""
+        if client is None:
+            raise ValueError("OpenAI is not configured (missing OPENAI_API_KEY)")
         try:
             segments = result_data.get("segments", [])
             if not segments:
                 raise ValueError("No segments found")
 
-            language = result_data.get("language", "es")
+            language = result_data.get("language") or "es"
 
             # Truncate segments if too many (sample from beginning, middle, end)
-            if len(segments) > 100:
-                sampled_segments = segments[:40] + segments[len(segments)//2 - 10:len(segments)//2 + 10] + segments[-40:]
-            else:
-                sampled_segments = segments
+            sampled_segments = sample_segments(segments)
 
             formatted_segments = [
                 {
@@ -104,7 +113,7 @@ class AgentIdentificationService:
                 }
                 for s in sampled_segments
             ]
-            segments_json = json.dumps(formatted_segments, ensure_ascii=False)
+            segments_json = orjson.dumps(formatted_segments).decode()
 
             # Final safety check
             if len(segments_json) > 50000:
@@ -143,7 +152,7 @@ Segments:
                 temperature=0.3
             )
 
-            identification = json.loads(response.choices[0].message.content)
+            identification = orjson.loads(response.choices[0].message.content)
             return identification
 
         except Exception as e:
@@ -153,11 +162,5 @@ Segments:
     @staticmethod
     def _save_identification(db: Session, task_uuid: str, identification: Dict[str, str]):
         """Save identification to database."""
-        query = text("""
-            INSERT INTO agent_identifications (original_uuid, agent_identification, created_at)
-            VALUES (:uuid, :identification, NOW())
-            ON CONFLICT (original_uuid) DO UPDATE
-            SET agent_identification = :identification
-        """)
-        db.execute(query, {"uuid": task_uuid, "identification": json.dumps(identification)})
+        db.execute(_SAVE_IDENTIFICATION_STMT, {"uuid": task_uuid, "identification": orjson.dumps(identification).decode()})
         db.commit()
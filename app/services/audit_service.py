@@ -2,18 +2,128 @@
 Service for audit generation (simplified for External API).
 """
 import os
-import json
+import orjson
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from openai import OpenAI
+from sqlalchemy import bindparam, column, select, table, text
+from sqlalchemy.dialects.postgresql import JSONB
+from cachetools import TTLCache
+from openai import RateLimitError
 
 from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.openai_client import client
+from app.core.transcript import sample_segments
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+# Static instructions go first and byte-identical on every call so OpenAI's
+# prompt prefix cache can reuse them; criteria and transcription follow.
+AUDIT_SYSTEM_PROMPT = """Eres un experto en calidad de atención al cliente.
+
+Evalúa la llamada del usuario según los criterios que se te entregan como JSON
+(id, question, target_score).
+
+Instrucciones:
+- Evalúa CADA criterio de 0 a su target_score
+- Sé objetivo y basado solo en la transcripción
+- Responde SOLO con JSON válido:
+{
+  "answers": [
+    {
+      "id": <question_id>,
+      "question": "<nombre>",
+      "target_score": <max>,
+      "score": <dado>,
+      "observations": "<justificación>"
+    }
+  ]
+}"""
+
+
+# Lightweight table clause (the schema is owned by the Backend service).
+# Statements are built once at import so SQLAlchemy's compiled cache is hit
+# on every audit instead of re-parsing a fresh text() construct.
+_audit_criteria = table(
+    "audit_criteria",
+    column("id"), column("campaign_id"), column("question"), column("target_score"),
+)
+
+_AUDIT_CONTEXT_STMT = text("""
+    SELECT a.task_uuid AS audit_task_uuid, a.score, a.is_audit_failure,
+           a.generated_by_user, a.audit,
+           t.uuid, t.file_name, t.status,
+           CASE WHEN a.task_uuid IS NULL OR CAST(:force AS BOOLEAN)
+                THEN t.result END AS result,
+           cl.campaign_id, cl.operator_id, cl.upload_by AS user_id,
+           c.approval_score, c.updated_at AS campaign_updated_at
+    FROM (SELECT CAST(:uuid AS VARCHAR) AS uuid) k
+    LEFT JOIN audits a ON a.task_uuid = k.uuid
+    LEFT JOIN tasks t ON t.uuid = k.uuid
+    LEFT JOIN call_logs cl ON cl.file_name = t.file_name
+    LEFT JOIN campaigns c ON c.campaign_id = cl.campaign_id
+    LIMIT 1
+""")
+_OWNED_TASKS_STMT = text("""
+    SELECT uuid
+    FROM tasks
+    WHERE uuid = ANY(:uuids)
+      AND task_params->>'api_key_id' = :api_key_id
+""")
+# audits.task_uuid has no unique index (the schema is owned by the Backend
+# service), so ON CONFLICT is not an option: overwrite the task's audit if it
+# exists, insert it otherwise. _AUDIT_LOCK_STMT serializes writers per task.
+_AUDIT_LOCK_STMT = text("SELECT pg_advisory_xact_lock(hashtext(:key))")
+_INSERT_AUDIT_STMT = text("""
+    WITH task_update AS (
+        UPDATE tasks
+        SET status = :task_status, updated_at = NOW()
+        WHERE uuid = :task_uuid
+    ),
+    updated AS (
+        UPDATE audits
+        SET campaign_id = :campaign_id,
+            user_id = :user_id,
+            score = :score,
+            is_audit_failure = :is_audit_failure,
+            audit = :audit,
+            generated_by_user = :generated_by_user
+        WHERE task_uuid = :task_uuid
+        RETURNING id
+    ),
+    inserted AS (
+        INSERT INTO audits
+        (task_uuid, campaign_id, user_id, score, is_audit_failure,
+         audit, generated_by_user, created_at)
+        SELECT :task_uuid, :campaign_id, :user_id, :score, :is_audit_failure,
+               :audit, :generated_by_user, NOW()
+        WHERE NOT EXISTS (SELECT 1 FROM updated)
+        RETURNING id
+    )
+    SELECT id FROM updated
+    UNION ALL
+    SELECT id FROM inserted
+    LIMIT 1
+""").bindparams(bindparam("audit", type_=JSONB))
+_CRITERIA_STMT = (
+    select(_audit_criteria.c.id, _audit_criteria.c.question, _audit_criteria.c.target_score)
+    .where(_audit_criteria.c.campaign_id == bindparam("campaign_id"))
+    .order_by(_audit_criteria.c.id)
+)
+
+# Campaign criteria change on the order of days; keep them in-process so hot
+# campaigns skip the lookup. Keys include campaigns.updated_at, so an edited
+# campaign gets a fresh entry; the TTL bounds staleness for criteria edits
+# that do not touch the campaign row.
+_criteria_cache: TTLCache = TTLCache(maxsize=512, ttl=300)
+_criteria_json_cache: TTLCache = TTLCache(maxsize=512, ttl=300)
+# TTLCache is not thread-safe; routes run on the threadpool and batch
+# regeneration fans out over workers.
+_criteria_lock = threading.Lock()
 
 
 class AuditService:
@@ -23,15 +133,18 @@ class AuditService:
     def generate_audit_for_call(
         db: Session,
         task_uuid: str,
-        username: str = "external_api"
+        username: str = "external_api",
+        force: bool = False
     ) -> Dict[str, Any]:
         """
         Generate an audit for a call using OpenAI.
+        With force=True an existing audit is regenerated and overwritten.
         """
         try:
-            # 1. Check if audit already exists
-            existing = AuditService._get_existing_audit(db, task_uuid, is_call=True)
-            if existing:
+            # 1. Existing audit, task, call log and campaign in one round-trip
+            context = AuditService._get_audit_context(db, task_uuid, force)
+            existing = context["existing"]
+            if existing and not force:
                 return {
                     "success": True,
                     "task_uuid": task_uuid,
@@ -42,7 +155,7 @@ class AuditService:
                 }
 
             # 2. Get task data
-            task_data = AuditService._get_task_with_call_log(db, task_uuid)
+            task_data = context["task"]
             if not task_data:
                 return {
                     "success": False,
@@ -54,28 +167,30 @@ class AuditService:
             if not campaign_id:
                 return {"success": False, "message": "No campaign assigned"}
 
-            criteria = AuditService._get_audit_criteria(db, campaign_id)
+            criteria_key = (campaign_id, context["campaign_updated_at"])
+            criteria = AuditService._get_audit_criteria(db, criteria_key)
             if not criteria:
                 return {"success": False, "message": "No audit criteria found for campaign"}
 
-            # 4. Get campaign approval score
-            approval_score = AuditService._get_campaign_approval_score(db, campaign_id)
+            # 4. Campaign approval score (joined in step 1)
+            approval_score = context["approval_score"] or 70.0
 
-            # 5. Get transcription
-            transcription = AuditService._get_transcription(db, task_uuid)
+            # 5. Get transcription (already loaded with the task row)
+            transcription = AuditService._get_transcription(task_data)
             if not transcription:
                 return {"success": False, "message": "No transcription found"}
 
             # 6. Generate audit with OpenAI
             audit_results = AuditService._generate_audit_with_ai(
                 transcription=transcription,
-                criteria=criteria,
+                criteria_json=AuditService._get_criteria_json(criteria_key, criteria),
                 task_data=task_data
             )
 
             if "error" in audit_results:
                 return {
                     "success": False,
+                    "status_code": audit_results.get("status_code", 400),
                     "message": audit_results.get("message", "Error generating audit")
                 }
 
@@ -86,7 +201,7 @@ class AuditService:
                 approval_score
             )
 
-            # 8. Insert audit
+            # 8. Insert audit and mark the task as audited (one statement)
             AuditService._insert_audit(
                 db=db,
                 task_uuid=task_uuid,
@@ -97,9 +212,7 @@ class AuditService:
                 audit=audit_results['answers'],
                 generated_by_user=username
             )
-
-            # 9. Update task status
-            AuditService._update_task_status(db, task_uuid, "audited")
+            db.commit()
 
             return {
                 "success": True,
@@ -120,6 +233,44 @@ class AuditService:
                 "message": f"Error generating audit: {str(e)}"
             }
 
+    @staticmethod
+    def regenerate_audits_batch(
+        db: Session,
+        task_uuids: List[str],
+        api_key_id: int,
+        username: str = "external_api",
+        max_workers: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Regenerate audits for several calls at once.
+
+        Only tasks owned by the API key are regenerated; the rest are reported
+        as not found. The per-task OpenAI calls fan out over a bounded thread
+        pool, and each new audit overwrites the old one through the upsert, so
+        a failed regeneration keeps the previous audit. Each worker uses its
+        own session because Session objects are not thread-safe.
+        """
+        owned = set(db.execute(
+            _OWNED_TASKS_STMT, {"uuids": task_uuids, "api_key_id": str(api_key_id)}
+        ).scalars())
+        # End the read-only transaction before the long-running OpenAI calls
+        db.rollback()
+
+        def regenerate_one(task_uuid: str) -> Dict[str, Any]:
+            if task_uuid not in owned:
+                return {"success": False, "task_uuid": task_uuid, "message": "Task not found"}
+            worker_db = SessionLocal()
+            try:
+                result = AuditService.generate_audit_for_call(worker_db, task_uuid, username, force=True)
+            finally:
+                worker_db.close()
+            # status_code is the single-audit route's HTTP status, not part of an item
+            result.pop("status_code", None)
+            return result
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(task_uuids))) as pool:
+            return list(pool.map(regenerate_one, task_uuids))
+
     @staticmethod
     def generate_audit_for_chat(
         db: Session,
@@ -137,158 +288,120 @@ class AuditService:
             logger.error(f"Error generating chat audit: {e}", exc_info=True)
             return {"success": False, "message": str(e)}
 
+    @staticmethod
+    def invalidate_campaign_cache(campaign_id: int) -> None:
+        """Drop cached criteria after a campaign is edited."""
+        with _criteria_lock:
+            for cache in (_criteria_cache, _criteria_json_cache):
+                for key in [k for k in cache if k[0] == campaign_id]:
+                    cache.pop(key, None)
+
     # ========== HELPER METHODS ==========
 
     @staticmethod
-    def _get_existing_audit(db: Session, task_uuid: str, is_call: bool = True) -> Optional[Dict]:
-        """Check if audit already exists."""
-        if is_call:
-            query = text("""
-                SELECT task_uuid, score, is_audit_failure, generated_by_user, audit
-                FROM audits
-                WHERE task_uuid = :uuid
-                LIMIT 1
-            """)
-        else:
-            query = text("""
-                SELECT chat_uuid, score, is_audit_failure, generated_by_user
-                FROM chats_quality
-                WHERE chat_uuid = :uuid
-                LIMIT 1
-            """)
-        result = db.execute(query, {"uuid": task_uuid}).fetchone()
-        if result:
-            audit_data = result[4] if is_call and len(result) > 4 else None
-            if audit_data and isinstance(audit_data, str):
-                audit_data = json.loads(audit_data)
-            return {
-                "task_uuid": result[0],
-                "score": result[1],
-                "is_audit_failure": result[2],
-                "generated_by_user": result[3],
-                "audit": audit_data if is_call else None
+    def _get_audit_context(db: Session, task_uuid: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Fetch the existing audit, the task with its call log and the campaign
+        approval score in a single query. The (potentially large) transcription
+        is only transferred when there is no audit yet, or when force is set.
+        """
+        row = db.execute(_AUDIT_CONTEXT_STMT, {"uuid": task_uuid, "force": force}).mappings().one()
+        existing = None
+        if row["audit_task_uuid"] is not None:
+            existing = {
+                "task_uuid": row["audit_task_uuid"],
+                "score": row["score"],
+                "is_audit_failure": row["is_audit_failure"],
+                "generated_by_user": row["generated_by_user"],
+                "audit": row["audit"]
             }
-        return None
-
-    @staticmethod
-    def _get_task_with_call_log(db: Session, task_uuid: str) -> Optional[Dict]:
-        """Get task and call_log data."""
-        query = text("""
-            SELECT t.uuid, t.file_name, t.status, t.result,
-                   cl.campaign_id, cl.operator_id, cl.upload_by
-            FROM tasks t
-            LEFT JOIN call_logs cl ON cl.file_name = t.file_name
-            WHERE t.uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).fetchone()
-        if result:
-            return {
-                "uuid": result[0],
-                "file_name": result[1],
-                "status": result[2],
-                "result": result[3],
-                "campaign_id": result[4],
-                "operator_id": result[5],
-                "user_id": result[6]
+        task = None
+        if row["uuid"] is not None:
+            task = {
+                "uuid": row["uuid"],
+                "file_name": row["file_name"],
+                "status": row["status"],
+                "result": row["result"],
+                "campaign_id": row["campaign_id"],
+                "operator_id": row["operator_id"],
+                "user_id": row["user_id"]
             }
-        return None
+        return {
+            "existing": existing,
+            "task": task,
+            "approval_score": row["approval_score"],
+            "campaign_updated_at": row["campaign_updated_at"]
+        }
 
     @staticmethod
-    def _get_audit_criteria(db: Session, campaign_id: int) -> List[Dict]:
-        """Get audit criteria for campaign."""
-        query = text("""
-            SELECT id, question, target_score
-            FROM audit_criteria
-            WHERE campaign_id = :campaign_id
-            ORDER BY id
-        """)
-        results = db.execute(query, {"campaign_id": campaign_id}).fetchall()
-        return [
-            {"id": r[0], "question": r[1], "target_score": r[2]}
-            for r in results
-        ]
+    def _get_audit_criteria(db: Session, criteria_key: Tuple[int, Any]) -> List[Dict]:
+        """
+        Get audit criteria for campaign, cached by (campaign_id, campaign.updated_at)
+        so editing the campaign naturally bypasses stale entries.
+        """
+        with _criteria_lock:
+            cached = _criteria_cache.get(criteria_key)
+        if cached is not None:
+            return cached
+        rows = db.execute(_CRITERIA_STMT, {"campaign_id": criteria_key[0]}).mappings().all()
+        criteria = [dict(r) for r in rows]
+        if criteria:
+            with _criteria_lock:
+                _criteria_cache[criteria_key] = criteria
+        return criteria
 
     @staticmethod
-    def _get_campaign_approval_score(db: Session, campaign_id: int) -> float:
-        """Get campaign approval score."""
-        query = text("""
-            SELECT approval_score
-            FROM campaigns
-            WHERE campaign_id = :campaign_id
-            LIMIT 1
-        """)
-        result = db.execute(query, {"campaign_id": campaign_id}).scalar()
-        return result or 70.0
+    def _get_criteria_json(criteria_key: Tuple[int, Any], criteria: List[Dict]) -> str:
+        """Prompt-ready criteria JSON, serialized once per campaign version."""
+        with _criteria_lock:
+            cached = _criteria_json_cache.get(criteria_key)
+        if cached is not None:
+            return cached
+        # orjson emits compact UTF-8, keeping whitespace out of the billed prompt tokens
+        criteria_json = orjson.dumps([
+            {"id": c['id'], "question": c['question'], "target_score": c['target_score']}
+            for c in criteria
+        ]).decode()
+        with _criteria_lock:
+            _criteria_json_cache[criteria_key] = criteria_json
+        return criteria_json
 
     @staticmethod
-    def _get_transcription(db: Session, task_uuid: str) -> Optional[str]:
-        """Get transcription text from task."""
-        query = text("""
-            SELECT result
-            FROM tasks
-            WHERE uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).scalar()
-        if result:
-            if isinstance(result, str):
-                result = json.loads(result)
-            return json.dumps(result, ensure_ascii=False)
-        return None
+    def _get_transcription(task_data: Dict) -> Optional[Dict]:
+        """Get the transcription result from the task row fetched in step 2."""
+        result = task_data.get("result")
+        if result and isinstance(result, str):
+            result = orjson.loads(result)
+        return result or None
 
     @staticmethod
     def _generate_audit_with_ai(
-        transcription: str,
-        criteria: List[Dict],
+        transcription: Dict,
+        criteria_json: str,
         task_data: Dict
     ) -> Dict[str, Any]:
         """Generate audit using OpenAI."""
+        if client is None:
+            return {"error": True, "message": "OpenAI no está configurado (falta OPENAI_API_KEY)"}
         try:
             # Truncate transcription to avoid context length errors
-            transcription_data = json.loads(transcription) if isinstance(transcription, str) else transcription
+            transcription_data = orjson.loads(transcription) if isinstance(transcription, str) else transcription
             segments = transcription_data.get("segments", [])
 
             # Sample segments if too many
             if len(segments) > 100:
-                sampled_segments = segments[:40] + segments[len(segments)//2 - 10:len(segments)//2 + 10] + segments[-40:]
-                transcription_data["segments"] = sampled_segments
+                transcription_data = {**transcription_data, "segments": sample_segments(segments)}
 
             # Convert back to string and apply final size limit
-            truncated_transcription = json.dumps(transcription_data, ensure_ascii=False)
+            truncated_transcription = orjson.dumps(transcription_data).decode()
             if len(truncated_transcription) > 50000:
                 truncated_transcription = truncated_transcription[:50000] + '...]'
 
-            criteria_text = "\n".join([
-                f"- {c['question']} (Puntaje máximo: {c['target_score']})"
-                for c in criteria
-            ])
-
-            system_prompt = f"""Eres un experto en calidad de atención al cliente.
-
-Evalúa la siguiente llamada según estos criterios:
-{criteria_text}
-
-Instrucciones:
-- Evalúa CADA criterio de 0 a {max(c['target_score'] for c in criteria)}
-- Sé objetivo y basado solo en la transcripción
-- Responde SOLO con JSON válido:
-{{
-  "answers": [
-    {{
-      "id": <question_id>,
-      "question": "<nombre>",
-      "target_score": <max>,
-      "score": <dado>,
-      "observations": "<justificación>"
-    }}
-  ]
-}}"""
-
             response = client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": AUDIT_SYSTEM_PROMPT},
+                    {"role": "system", "content": f"Criterios: {criteria_json}"},
                     {"role": "user", "content": truncated_transcription}
                 ],
                 response_format={"type": "json_object"},
@@ -296,7 +409,7 @@ Instrucciones:
             )
 
             content = response.choices[0].message.content
-            result = json.loads(content)
+            result = orjson.loads(content)
 
             return {
                 "answers": result.get("answers", []),
@@ -305,6 +418,14 @@ Instrucciones:
                 "model_name": "gpt-4o-mini"
             }
 
+        except RateLimitError as e:
+            # The SDK already retried with exponential backoff; tell the caller to back off too
+            logger.warning(f"OpenAI rate limit persisted after retries: {e}")
+            return {
+                "error": True,
+                "status_code": 429,
+                "message": f"OpenAI rate limit: {str(e)}"
+            }
         except Exception as e:
             logger.error(f"Error calling OpenAI: {e}", exc_info=True)
             return {
@@ -319,8 +440,26 @@ Instrucciones:
         approval_score: float
     ) -> tuple[float, bool]:
         """Calculate score and determine failure."""
-        total_score = sum(a.get('score', 0) for a in answers)
-        max_score = sum(c['target_score'] for c in criteria)
+        # Index answers once so each criterion is matched in O(1). Ids are
+        # compared as strings because the model may return "3" for 3.
+        answers_by_id = {str(a['id']): a for a in answers if a.get('id') is not None}
+        answers_by_question = {a['question']: a for a in answers if a.get('question')}
+
+        total_score = 0
+        max_score = 0
+        matched = set()
+        for c in criteria:
+            max_score += c['target_score']
+            answer = answers_by_id.get(str(c['id'])) or answers_by_question.get(c['question'])
+            if answer:
+                matched.add(id(answer))
+                total_score += answer.get('score', 0)
+
+        # Answers for criteria outside the campaign do not count towards the score
+        unmatched = [a.get('id', a.get('question')) for a in answers if id(a) not in matched]
+        if unmatched:
+            logger.warning(f"Ignoring audit answers that match no campaign criterion: {unmatched}")
+
         normalized = (total_score / max_score * 100) if max_score > 0 else 0
         is_failure = normalized < approval_score
         return round(normalized, 2), is_failure
@@ -334,36 +473,25 @@ Instrucciones:
         score: float,
         is_audit_failure: bool,
         audit: List[Dict],
-        generated_by_user: str
+        generated_by_user: str,
+        task_status: str = "audited"
     ) -> int:
-        """Insert audit into database."""
-        query = text("""
-            INSERT INTO audits
-            (task_uuid, campaign_id, user_id, score, is_audit_failure,
-             audit, generated_by_user, created_at)
-            VALUES (:task_uuid, :campaign_id, :user_id, :score, :is_audit_failure,
-                    :audit, :generated_by_user, NOW())
-            RETURNING id
-        """)
-        result = db.execute(query, {
+        """
+        Insert (or overwrite) the audit for a task and set the task's status in
+        the same statement. Writers of the same task are serialized with a
+        transaction-scoped advisory lock, so two concurrent audits end up as a
+        single row.
+        The caller is responsible for committing.
+        """
+        db.execute(_AUDIT_LOCK_STMT, {"key": f"audit:{task_uuid}"})
+        result = db.execute(_INSERT_AUDIT_STMT, {
             "task_uuid": task_uuid,
             "campaign_id": campaign_id,
             "user_id": user_id,
             "score": score,
             "is_audit_failure": is_audit_failure,
-            "audit": json.dumps(audit),
-            "generated_by_user": generated_by_user
+            "audit": audit,
+            "generated_by_user": generated_by_user,
+            "task_status": task_status
         })
-        db.commit()
         return result.scalar()
-
-    @staticmethod
-    def _update_task_status(db: Session, task_uuid: str, status: str):
-        """Update task status."""
-        query = text("""
-            UPDATE tasks
-            SET status = :status, updated_at = NOW()
-            WHERE uuid = :uuid
-        """)
-        db.execute(query, {"status": status, "uuid": task_uuid})
-        db.commit()
@@ -0,0 +1,34 @@
+"""
+In-process cache for LLM responses, keyed on the exact request content.
+Identical transcripts (re-uploads, retries) reuse the parsed response instead
+of paying another multi-second OpenAI round-trip.
+"""
+import hashlib
+import threading
+import orjson
+from typing import Any, Dict
+from cachetools import TTLCache
+
+_cache: TTLCache = TTLCache(maxsize=1024, ttl=7 * 24 * 3600)
+# TTLCache is not thread-safe; bulk tag generation reads and writes it from
+# a thread pool.
+_lock = threading.Lock()
+
+
+def cache_key(model: str, system_prompt: str, user_content: str) -> str:
+    """SHA-256 of the model, system prompt and user content."""
+    payload = orjson.dumps(
+        {"model": model, "sys": system_prompt, "u": user_content},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+def get(key: str) -> Dict[str, Any] | None:
+    with _lock:
+        return _cache.get(key)
+
+
+def set(key: str, value: Dict[str, Any]) -> None:
+    with _lock:
+        _cache[key] = value
@@ -5,49 +5,80 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# With an index on tasks (created_at, status) this is an index-only scan:
+#   CREATE INDEX tasks_created_status_idx ON tasks (created_at, status);
+_TASK_STATS_SQL = """
+    SELECT
+        COUNT(*) as total,
+        COUNT(*) FILTER (WHERE status = 'pending') as pending,
+        COUNT(*) FILTER (WHERE status = 'processing') as processing,
+        COUNT(*) FILTER (WHERE status = 'completed') as completed,
+        COUNT(*) FILTER (WHERE status = 'failed') as failed
+    FROM tasks
+    WHERE created_at >= :start_date AND created_at <= :end_date
+"""
+
+_AUDIT_STATS_SQL = """
+    SELECT
+        COUNT(*) as total_audits,
+        AVG(score) as avg_score,
+        COUNT(*) FILTER (WHERE is_audit_failure) as failures
+    FROM audits
+    WHERE created_at >= :start_date AND created_at <= :end_date
+"""
+
+_TASK_STATS_STMT = text(_TASK_STATS_SQL)
+_AUDIT_STATS_STMT = text(_AUDIT_STATS_SQL)
+_COMBINED_STATS_STMT = text(f"""
+    SELECT t.*, a.*
+    FROM ({_TASK_STATS_SQL}) t
+    CROSS JOIN ({_AUDIT_STATS_SQL}) a
+""")
+
+
 class ReportsService:
     @staticmethod
-    def get_task_stats(db: Session, days: int = 30) -> dict:
+    def _period(days: int) -> dict:
         end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        query = text("""
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending,
-                SUM(CASE WHEN status = 'processing' THEN 1 ELSE 0 END) as processing,
-                SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
-                SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed
-            FROM tasks
-            WHERE created_at >= :start_date AND created_at <= :end_date
-        """)
-        result = db.execute(query, {"start_date": start_date, "end_date": end_date}).fetchone()
+        return {"start_date": end_date - timedelta(days=days), "end_date": end_date}
+
+    @staticmethod
+    def _task_stats(row, days: int) -> dict:
         return {
-            "total": result[0] or 0,
-            "pending": result[1] or 0,
-            "processing": result[2] or 0,
-            "completed": result[3] or 0,
-            "failed": result[4] or 0,
+            "total": row["total"] or 0,
+            "pending": row["pending"] or 0,
+            "processing": row["processing"] or 0,
+            "completed": row["completed"] or 0,
+            "failed": row["failed"] or 0,
             "period_days": days
         }
 
     @staticmethod
-    def get_audit_stats(db: Session, days: int = 30) -> dict:
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        query = text("""
-            SELECT
-                COUNT(*) as total,
-                AVG(score) as avg_score,
-                SUM(CASE WHEN is_audit_failure = true THEN 1 ELSE 0 END) as failures
-            FROM audits
-            WHERE created_at >= :start_date AND created_at <= :end_date
-        """)
-        result = db.execute(query, {"start_date": start_date, "end_date": end_date}).fetchone()
-        total = result[0] or 0
-        failures = result[2] or 0
+    def _audit_stats(row) -> dict:
+        total = row["total_audits"] or 0
+        failures = row["failures"] or 0
         return {
             "total_audits": total,
-            "average_score": round(float(result[1] or 0), 2),
+            "average_score": round(float(row["avg_score"] or 0), 2),
             "failure_count": failures,
             "failure_rate": round(failures / total, 2) if total > 0 else 0.0
         }
+
+    @staticmethod
+    def get_task_stats(db: Session, days: int = 30) -> dict:
+        row = db.execute(_TASK_STATS_STMT, ReportsService._period(days)).mappings().one()
+        return ReportsService._task_stats(row, days)
+
+    @staticmethod
+    def get_audit_stats(db: Session, days: int = 30) -> dict:
+        row = db.execute(_AUDIT_STATS_STMT, ReportsService._period(days)).mappings().one()
+        return ReportsService._audit_stats(row)
+
+    @staticmethod
+    def get_combined_stats(db: Session, days: int = 30) -> dict:
+        """Task and audit stats for the same period in a single round-trip."""
+        row = db.execute(_COMBINED_STATS_STMT, ReportsService._period(days)).mappings().one()
+        return {
+            "tasks": ReportsService._task_stats(row, days),
+            "audits": ReportsService._audit_stats(row)
+        }
@@ -1,17 +1,63 @@
 import logging
 import boto3
+import botocore.config
+import mimetypes
 import os
-from botocore.exceptions import NoCredentialsError
+from functools import lru_cache
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError, NoCredentialsError
 
+# Shared by every client: keep HTTPS connections alive across calls and retry
+# transient errors with the standard backoff mode.
+_CLIENT_CONFIG = botocore.config.Config(
+    max_pool_connections=50,
+    retries={'mode': 'standard', 'max_attempts': 3}
+)
 
+# Call audio is usually 1-100 MB: move it in 16 MB parts, up to 10 in
+# parallel, rather than boto3's 8 MB defaults.
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
+
+
+# Fallback for common audio formats the platform's mimetypes table may not know
+_AUDIO_CONTENT_TYPES = {
+    '.wav': 'audio/wav',
+    '.mp3': 'audio/mpeg',
+    '.ogg': 'audio/ogg',
+}
+
+
+@lru_cache(maxsize=256)
+def _guess_mime(ext: str) -> str:
+    mime_type, _ = mimetypes.guess_type(f"file{ext}")
+    return mime_type or _AUDIO_CONTENT_TYPES.get(ext, 'application/octet-stream')
+
+
+def guess_content_type(object_name: str) -> str:
+    """Content type for a file name, memoized per extension."""
+    return _guess_mime(os.path.splitext(object_name)[1].lower())
+
+
+@lru_cache(maxsize=1)
 def get_s3_client():
+    """
+    Return the process-wide S3 client. boto3 clients are thread-safe, and
+    building one (config parsing, credential and endpoint resolution) is far
+    more expensive than the calls made with it.
+    """
     return boto3.client(
         's3',
         aws_access_key_id=os.getenv(
             'S3_ACCESS_KEY') or os.getenv('MINIO_ACCESS_KEY'),
         aws_secret_access_key=os.getenv(
             'S3_SECRET_KEY') or os.getenv('MINIO_SECRET_ACCESS_KEY'),
-        endpoint_url=os.getenv('S3_ENDPOINT') or os.getenv('MINIO_URL')
+        endpoint_url=os.getenv('S3_ENDPOINT') or os.getenv('MINIO_URL'),
+        config=_CLIENT_CONFIG
     )
 
 
@@ -28,22 +74,16 @@ def upload_file_to_s3(file_path, bucket_name, object_name=None):
     if object_name is None:
         object_name = os.path.basename(file_path)
 
-    # Determine content type
-    import mimetypes
-    content_type, _ = mimetypes.guess_type(file_path)
-    if content_type is None:
-        content_type = 'application/octet-stream'
-
     extra_args = {
-        'ContentType': content_type,
+        'ContentType': guess_content_type(file_path),
         'CacheControl': 'public, max-age=31536000, immutable'
     }
 
     s3_client = get_s3_client()
 
     try:
-        s3_client.upload_file(file_path, bucket_name,
-                              object_name, ExtraArgs=extra_args)
+        s3_client.upload_file(file_path, bucket_name, object_name,
+                              ExtraArgs=extra_args, Config=_TRANSFER_CONFIG)
     except FileNotFoundError:
         print("The file was not found")
         return False
@@ -87,7 +127,8 @@ def upload_fileobj_to_s3(file_obj, bucket_name, object_name, content_type=None):
             extra_args['ContentType'] = content_type
 
         s3_client.upload_fileobj(
-            file_obj, bucket_name, object_name, ExtraArgs=extra_args)
+            file_obj, bucket_name, object_name,
+            ExtraArgs=extra_args, Config=_TRANSFER_CONFIG)
     except Exception as e:
         logger.error(f"S3 Upload Error: {e}")
         print(f"DEBUG: S3 Upload Error: {e}", flush=True)
@@ -101,20 +142,20 @@ def download_file_from_s3(bucket_name, object_name, file_path):
     """
     s3_client = get_s3_client()
     try:
-        s3_client.download_file(bucket_name, object_name, file_path)
+        s3_client.download_file(bucket_name, object_name, file_path,
+                                Config=_TRANSFER_CONFIG)
     except Exception as e:
         logger.error(f"S3 Download Error: {e}")
         return False
     return True
 
 
+@lru_cache(maxsize=1)
 def get_presigned_s3_client():
     """
     Get a Boto3 client configured for generating presigned URLs with the external endpoint.
     This ensures the signature matches the Host header sent by the browser.
     """
-    import botocore.config
-
     # Use external endpoint (localhost:9000 for dev) or fallback to configured internal
     endpoint_url = os.getenv('S3_EXTERNAL_ENDPOINT', 'http://localhost:9000')
 
@@ -125,8 +166,8 @@ def get_presigned_s3_client():
         aws_secret_access_key=os.getenv(
             'S3_SECRET_KEY') or os.getenv('MINIO_SECRET_ACCESS_KEY'),
         endpoint_url=endpoint_url,
-        config=botocore.config.Config(signature_version='s3v4', s3={
-                                      'addressing_style': 'path'})
+        config=_CLIENT_CONFIG.merge(botocore.config.Config(
+            signature_version='s3v4', s3={'addressing_style': 'path'}))
     )
 
 
@@ -139,28 +180,15 @@ def create_presigned_url(bucket_name, object_name, expiration=3600):
     :param expiration: Time in seconds for the presigned URL to remain valid
     :return: Presigned URL as string. If error, returns None.
     """
-    import mimetypes
     try:
         # Use the specialized client that knows about the external hostname
         s3_client = get_presigned_s3_client()
 
-        # Guess mime type to ensure browser plays it
-        mime_type, _ = mimetypes.guess_type(object_name)
-        if not mime_type:
-            # Fallback for common audio formats if guessing fails
-            if object_name.lower().endswith('.wav'):
-                mime_type = 'audio/wav'
-            elif object_name.lower().endswith('.mp3'):
-                mime_type = 'audio/mpeg'
-            elif object_name.lower().endswith('.ogg'):
-                mime_type = 'audio/ogg'
-            else:
-                mime_type = 'application/octet-stream'
-
         params = {
             'Bucket': bucket_name,
             'Key': object_name,
-            'ResponseContentType': mime_type
+            # Explicit content type so the browser plays it
+            'ResponseContentType': guess_content_type(object_name)
         }
 
         response = s3_client.generate_presigned_url(
@@ -185,6 +213,21 @@ def get_s3_object(bucket_name, object_name):
         return None
 
 
+def get_s3_object_if_exists(bucket_name, object_name):
+    """
+    Get an object in a single GET, or None if it does not exist. Use this
+    instead of check_file_exists_in_s3 followed by get_s3_object, which costs
+    an extra HEAD round-trip. Errors other than a missing key are raised.
+    """
+    s3_client = get_s3_client()
+    try:
+        return s3_client.get_object(Bucket=bucket_name, Key=object_name)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+
+
 def check_file_exists_in_s3(bucket_name, object_name):
     """
     Check if an object exists in an S3 bucket
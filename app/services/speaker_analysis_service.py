@@ -2,20 +2,90 @@
 Service for speaker analysis (simplified for External API).
 """
 import os
-import json
+import orjson
 import logging
+import time
+from functools import lru_cache
 from typing import Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 
 from app.core.config import get_settings
+from app.core.openai_client import http_client
+from app.core.transcript import sample_segments
+from app.services import llm_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_MODEL_NAME = "gpt-4o-mini"
+_SYSTEM_PROMPT = """# Role
+You are an expert speaker analyzer.
+
+# Task
+From the given transcription make a thorough evaluation of speakers.
+
+# Rules
+Evaluation MUST be in Spanish (voseo).
+Speaker keys must match those in transcription.
+Output MUST be a JSON object with speaker IDs as keys (e.g., "SPEAKER_00").
+Do NOT return a list.
+Identify roles (Agent, Customer) and refer to them as such.
+
+# Example Output
+{{
+  "SPEAKER_00": "Description...",
+  "SPEAKER_01": "Description..."
+}}"""
+_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _SYSTEM_PROMPT),
+    ("user", "<transcription>\n{transcription}\n</transcription>")
+])
+
+
+@lru_cache(maxsize=1)
+def _get_chain():
+    """
+    Prompt | model, built once on first use (not at import, so the service
+    loads without an OpenAI key). JSON mode guarantees a single JSON object,
+    which is parsed locally instead of going through JsonOutputParser.
+    """
+    model = ChatOpenAI(
+        model=_MODEL_NAME,
+        temperature=0.7,
+        api_key=settings.OPENAI_API_KEY,
+        http_client=http_client
+    ).bind(response_format={"type": "json_object"})
+    return _PROMPT | model
+
+
+# Backoff (seconds) while another request generates the same analysis
+_CLAIM_WAIT_DELAYS = (0.5, 1, 2, 4, 8)
+
+_CLAIM_STMT = text("SELECT pg_try_advisory_xact_lock(hashtext(:key))")
+_EXISTING_ANALYSIS_STMT = text("""
+    SELECT analysis
+    FROM speaker_analysis
+    WHERE task_uuid = :uuid
+    LIMIT 1
+""")
+_TASK_SEGMENTS_STMT = text("""
+    SELECT t.uuid, sa.analysis,
+           CASE WHEN sa.analysis IS NULL THEN t.result::jsonb -> 'segments' END AS segments
+    FROM tasks t
+    LEFT JOIN speaker_analysis sa ON sa.task_uuid = t.uuid
+    WHERE t.uuid = :uuid
+    LIMIT 1
+""")
+_SAVE_ANALYSIS_STMT = text("""
+    INSERT INTO speaker_analysis (task_uuid, analysis, created_at)
+    VALUES (:uuid, CAST(:analysis AS jsonb), NOW())
+    ON CONFLICT (task_uuid) DO UPDATE
+    SET analysis = EXCLUDED.analysis
+""")
+
 
 class SpeakerAnalysisService:
     """Service for speaker analysis via External API."""
@@ -28,120 +98,98 @@ class SpeakerAnalysisService:
         if existing:
             return existing
 
-        # 2. Get task
+        # 2. Claim the task so concurrent requests don't pay for a duplicate
+        #    OpenAI call; the lock is released when _save_analysis commits.
+        if not SpeakerAnalysisService._try_claim(db, task_uuid):
+            existing = SpeakerAnalysisService._wait_for_analysis(db, task_uuid)
+            if existing:
+                return existing
+            # The other request failed or is too slow; generate it ourselves
+
+        # 3. Get task (and, in the same round-trip, the analysis in case another
+        #    request saved it between the check and the claim)
         task = SpeakerAnalysisService._get_task(db, task_uuid)
         if not task:
             raise ValueError("Task not found")
 
-        if not task.get('result') or 'segments' not in task['result']:
-            raise ValueError("No transcription segments found")
+        if task.get('analysis'):
+            return task['analysis']
 
-        segments = task['result']['segments']
+        segments = task.get('segments')
+        if segments is None:
+            raise ValueError("No transcription segments found")
 
-        # 3. Generate analysis
+        # 4. Generate analysis
         analysis = SpeakerAnalysisService._generate_with_openai(segments)
 
-        # 4. Save
+        # 5. Save
         SpeakerAnalysisService._save_analysis(db, task_uuid, analysis)
 
         return analysis
 
+    @staticmethod
+    def _try_claim(db: Session, task_uuid: str) -> bool:
+        """Take a transaction-scoped advisory lock for this task's analysis."""
+        return bool(db.execute(_CLAIM_STMT, {"key": f"speaker:{task_uuid}"}).scalar_one())
+
+    @staticmethod
+    def _wait_for_analysis(db: Session, task_uuid: str) -> Dict[str, Any] | None:
+        """Poll with backoff for the analysis another request is generating."""
+        for delay in _CLAIM_WAIT_DELAYS:
+            time.sleep(delay)
+            existing = SpeakerAnalysisService._get_existing_analysis(db, task_uuid)
+            if existing:
+                return existing
+        return None
+
     @staticmethod
     def _get_existing_analysis(db: Session, task_uuid: str) -> Dict[str, Any] | None:
         """Get existing analysis."""
-        query = text("""
-            SELECT analysis
-            FROM speaker_analysis
-            WHERE task_uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).scalar()
+        result = db.execute(_EXISTING_ANALYSIS_STMT, {"uuid": task_uuid}).scalar_one_or_none()
         if result:
             if isinstance(result, str):
-                return json.loads(result)
+                return orjson.loads(result)
             return result
         return None
 
     @staticmethod
     def _get_task(db: Session, task_uuid: str) -> Dict | None:
-        """Get task data."""
-        query = text("""
-            SELECT uuid, result
-            FROM tasks
-            WHERE uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).fetchone()
-        if result:
-            result_data = result[1]
-            if isinstance(result_data, str):
-                result_data = json.loads(result_data)
-            return {
-                "uuid": result[0],
-                "result": result_data
-            }
-        return None
+        """
+        Get task data together with its saved analysis, if any. The segments are
+        extracted (server-side) from the transcription result only when there is
+        no analysis yet.
+        """
+        row = db.execute(_TASK_SEGMENTS_STMT, {"uuid": task_uuid}).mappings().one_or_none()
+        if row is None:
+            return None
+        task = dict(row)
+        for field in ("analysis", "segments"):
+            if isinstance(task[field], str):
+                task[field] = orjson.loads(task[field])
+        return task
 
     @staticmethod
     def _generate_with_openai(segments: list) -> Dict[str, Any]:
         """Generate analysis using OpenAI via LangChain."""
         try:
-            system_prompt = """# Role
-You are an expert speaker analyzer.
-
-# Task
-From the given transcription make a thorough evaluation of speakers.
-
-# Rules
-Evaluation MUST be in Spanish (voseo).
-Speaker keys must match those in transcription.
-Output MUST be a JSON object with speaker IDs as keys (e.g., "SPEAKER_00").
-Do NOT return a list.
-Identify roles (Agent, Customer) and refer to them as such.
-
-# Example Output
-{{
-  "SPEAKER_00": "Description...",
-  "SPEAKER_01": "Description..."
-}}"""
-
             # Truncate segments if too many
-            if len(segments) > 100:
-                sampled_segments = segments[:40] + segments[len(segments)//2 - 10:len(segments)//2 + 10] + segments[-40:]
-            else:
-                sampled_segments = segments
+            sampled_segments = sample_segments(segments)
 
-            transcription_text = json.dumps(sampled_segments, ensure_ascii=False)
+            transcription_text = orjson.dumps(sampled_segments).decode()
 
             # Final safety check
             if len(transcription_text) > 50000:
                 transcription_text = transcription_text[:50000] + '...]'
 
-            model = ChatOpenAI(
-                model="gpt-4o-mini",
-                temperature=0.7,
-                api_key=settings.OPENAI_API_KEY
-            )
-
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("user", "<transcription>\n{transcription}\n</transcription>")
-            ])
-
-            chain = prompt | model | JsonOutputParser()
-            result = chain.invoke({"transcription": transcription_text})
-
-            # Ensure result is dict
-            if isinstance(result, list):
-                new_result = {}
-                for item in result:
-                    if isinstance(item, dict):
-                        for k, v in item.items():
-                            if isinstance(v, dict) and "perfil" in v:
-                                new_result[k] = v["perfil"]
-                            else:
-                                new_result[k] = v
-                result = new_result
+            key = llm_cache.cache_key(_MODEL_NAME, _SYSTEM_PROMPT, transcription_text)
+            cached = llm_cache.get(key)
+            if cached is not None:
+                return cached
+
+            response = _get_chain().invoke({"transcription": transcription_text})
+            result = orjson.loads(response.content)
+            logger.debug(f"Speaker analysis token usage: {response.response_metadata.get('token_usage')}")
+            llm_cache.set(key, result)
 
             return result
 
@@ -152,11 +200,5 @@ Identify roles (Agent, Customer) and refer to them as such.
     @staticmethod
     def _save_analysis(db: Session, task_uuid: str, analysis: Dict[str, Any]):
         """Save analysis to database."""
-        query = text("""
-            INSERT INTO speaker_analysis (task_uuid, analysis, created_at)
-            VALUES (:uuid, :analysis, NOW())
-            ON CONFLICT (task_uuid) DO UPDATE
-            SET analysis = :analysis
-        """)
-        db.execute(query, {"uuid": task_uuid, "analysis": json.dumps(analysis)})
+        db.execute(_SAVE_ANALYSIS_STMT, {"uuid": task_uuid, "analysis": orjson.dumps(analysis).decode()})
         db.commit()
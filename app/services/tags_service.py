@@ -2,18 +2,132 @@
 Service for generating tags (simplified for External API).
 """
 import os
-import json
+import orjson
 import logging
-from typing import Dict, List
+import tiktoken
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from openai import OpenAI
 
 from app.core.config import get_settings
+from app.core.openai_client import client
+from app.services import llm_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+_LANGUAGE_NAMES = {
+    "es": "Spanish", "en": "English", "pt": "Portuguese",
+    "fr": "French", "de": "German"
+}
+# Byte-identical on every call so OpenAI's prompt prefix cache can reuse it;
+# the tag language goes in the user message.
+_SYSTEM_PROMPT = """
+Generate max 5 tags that summarize the call center transcript.
+Also include extra tags for key topics.
+Tags must be in SCREAMING_SNAKE_CASE (e.g., TAG_NAME), written in the language
+given in the user message.
+
+Return them by calling emit_tags.
+"""
+
+# Forced, strict function call: the reply always has exactly this shape
+_TAGS_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "emit_tags",
+        "strict": True,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "tags": {"type": "array", "items": {"type": "string"}},
+                "extraTags": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["tags", "extraTags"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Max input tokens sent to the model for tagging (system prompt included)
+_CONTEXT_TOKEN_BUDGET = 8500
+# Room for the language line and per-message overhead
+_USER_MESSAGE_RESERVE = 256
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        return tiktoken.encoding_for_model(settings.TAGS_MODEL)
+    except KeyError:
+        # Model unknown to this tiktoken version: use the current OpenAI encoding
+        return tiktoken.get_encoding("o200k_base")
+
+
+@lru_cache(maxsize=1)
+def _transcript_token_budget() -> int:
+    """Tokens left for the transcript; the static system prompt is encoded only once."""
+    return _CONTEXT_TOKEN_BUDGET - len(_get_encoding().encode(_SYSTEM_PROMPT)) - _USER_MESSAGE_RESERVE
+
+
+_EXISTING_TAGS_STMT = text("""
+    SELECT tags
+    FROM generated_tags
+    WHERE uuid = :uuid
+    LIMIT 1
+""")
+# Only what tagging reads is extracted (server-side) from the transcription:
+# the texts of the head/middle/tail segment sample (first 40, middle 20, last
+# 40, same as sample_segments) and the language, so Python never parses the
+# rest of the document. The plain text is a fallback for results without
+# segments.
+_TRANSCRIPT_QUERY = """
+    SELECT t.uuid,
+           CASE
+               WHEN jsonb_array_length(s.segments) > 100 THEN
+                   jsonb_path_query_array(
+                       s.segments,
+                       '$[0 to 39, $m to $n, last - 39 to last].text',
+                       jsonb_build_object(
+                           'm', jsonb_array_length(s.segments) / 2 - 10,
+                           'n', jsonb_array_length(s.segments) / 2 + 9
+                       )
+                   )
+               ELSE jsonb_path_query_array(s.segments, '$[*].text')
+           END AS segment_texts,
+           t.result::jsonb ->> 'language' AS language,
+           CASE WHEN s.segments IS NULL THEN t.result::jsonb ->> 'text' END AS text
+    FROM tasks t
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN jsonb_typeof(t.result::jsonb -> 'segments') = 'array'
+                    THEN t.result::jsonb -> 'segments' END AS segments
+    ) s
+"""
+_TASK_TRANSCRIPT_STMT = text(_TRANSCRIPT_QUERY + """
+    WHERE t.uuid = :uuid
+    LIMIT 1
+""")
+_TASK_TRANSCRIPTS_STMT = text(_TRANSCRIPT_QUERY + """
+    WHERE t.uuid = ANY(:uuids)
+      AND t.task_params->>'api_key_id' = :api_key_id
+""")
+_SAVE_TAGS_STMT = text("""
+    INSERT INTO generated_tags (uuid, tags, created_at)
+    VALUES (:uuid, CAST(:tags AS jsonb), NOW())
+    ON CONFLICT (uuid) DO UPDATE
+    SET tags = EXCLUDED.tags
+""")
+# Bulk variant: all rows travel as one JSON array and are upserted by a single
+# statement (text() executemany would still be one round-trip per row).
+_SAVE_TAGS_MANY_STMT = text("""
+    INSERT INTO generated_tags (uuid, tags, created_at)
+    SELECT r.uuid, r.tags, NOW()
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS r(uuid varchar, tags jsonb)
+    ON CONFLICT (uuid) DO UPDATE
+    SET tags = EXCLUDED.tags
+""")
 
 
 class TagsService:
@@ -33,115 +147,153 @@ class TagsService:
         if not task:
             raise ValueError(f"Task {task_uuid} not found")
 
-        if not task.get('result'):
+        if not (task.get('segment_texts') or task.get('text')):
             raise ValueError("Task has no transcription")
 
         # 3. Generate tags
-        tags_data = TagsService._generate_tags_with_openai(task['result'])
+        tags_data = TagsService._generate_tags_with_openai(task, use_cache=not force_generate)
 
         # 4. Save
         TagsService._save_tags(db, task_uuid, tags_data)
 
         return tags_data
 
+    @staticmethod
+    def generate_tags_bulk(
+        db: Session,
+        task_uuids: List[str],
+        api_key_id: int,
+        max_workers: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        (Re)generate tags for several tasks at once.
+        Only tasks owned by the API key are processed; the rest are reported
+        as not found.
+
+        Loads every transcription with one query, runs the OpenAI calls over a
+        bounded thread pool and saves all tags with a single upsert statement.
+        Returns one result per task_uuid, in request order.
+        """
+        rows = db.execute(
+            _TASK_TRANSCRIPTS_STMT, {"uuids": task_uuids, "api_key_id": str(api_key_id)}
+        ).mappings().all()
+        tasks_by_uuid = {row["uuid"]: TagsService._decode_task(row) for row in rows}
+
+        def generate_one(task_uuid: str) -> Dict[str, Any]:
+            task = tasks_by_uuid.get(task_uuid)
+            if task is None:
+                return {"task_uuid": task_uuid, "success": False, "message": f"Task {task_uuid} not found"}
+            if not (task["segment_texts"] or task["text"]):
+                return {"task_uuid": task_uuid, "success": False, "message": "Task has no transcription"}
+            try:
+                tags_data = TagsService._generate_tags_with_openai(task, use_cache=False)
+            except ValueError as e:
+                return {"task_uuid": task_uuid, "success": False, "message": str(e)}
+            return {"task_uuid": task_uuid, "success": True, **tags_data}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(task_uuids))) as pool:
+            results = list(pool.map(generate_one, task_uuids))
+
+        # One row per uuid: ON CONFLICT cannot touch the same row twice
+        generated = list({
+            r["task_uuid"]: {"uuid": r["task_uuid"], "tags": {"tags": r["tags"], "extraTags": r["extraTags"]}}
+            for r in results if r["success"]
+        }.values())
+        if generated:
+            db.execute(_SAVE_TAGS_MANY_STMT, {"rows": orjson.dumps(generated).decode()})
+            db.commit()
+
+        return results
+
     @staticmethod
     def _get_existing_tags(db: Session, task_uuid: str) -> Dict[str, List[str]] | None:
         """Get existing tags."""
-        query = text("""
-            SELECT tags
-            FROM generated_tags
-            WHERE uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).scalar()
+        result = db.execute(_EXISTING_TAGS_STMT, {"uuid": task_uuid}).scalar_one_or_none()
         if result:
             if isinstance(result, str):
-                return json.loads(result)
+                return orjson.loads(result)
             return result
         return None
 
     @staticmethod
     def _get_task(db: Session, task_uuid: str) -> Dict | None:
-        """Get task data."""
-        query = text("""
-            SELECT uuid, result, status
-            FROM tasks
-            WHERE uuid = :uuid
-            LIMIT 1
-        """)
-        result = db.execute(query, {"uuid": task_uuid}).fetchone()
-        if result:
-            result_data = result[1]
-            if isinstance(result_data, str):
-                result_data = json.loads(result_data)
-            return {
-                "uuid": result[0],
-                "result": result_data,
-                "status": result[2]
-            }
-        return None
+        """Get the task's sampled segment texts, language and (fallback) text."""
+        row = db.execute(_TASK_TRANSCRIPT_STMT, {"uuid": task_uuid}).mappings().one_or_none()
+        if row is None:
+            return None
+        return TagsService._decode_task(row)
 
     @staticmethod
-    def _truncate_for_context(result_data: Dict, max_chars: int = 50000) -> str:
-        """Truncate transcription to fit within OpenAI context limits."""
-        segments = result_data.get("segments", [])
-
-        # If we have segments, sample from beginning, middle, and end
-        if segments and len(segments) > 100:
-            # Take first 40, middle 20, last 40 segments
-            sampled = segments[:40] + segments[len(segments)//2 - 10:len(segments)//2 + 10] + segments[-40:]
-            result_data_truncated = {**result_data, "segments": sampled}
-        else:
-            result_data_truncated = result_data
+    def _decode_task(row) -> Dict:
+        task = dict(row)
+        if isinstance(task["segment_texts"], str):
+            task["segment_texts"] = orjson.loads(task["segment_texts"])
+        return task
 
-        transcript_text = json.dumps(result_data_truncated, ensure_ascii=False)
+    @staticmethod
+    def _truncate_for_context(result_data: Dict, max_tokens: int | None = None) -> str:
+        """
+        Flatten the transcription to plain text lines (timestamps, confidences and
+        word arrays only cost tokens) and cut it to a token budget.
+        """
+        segment_texts = result_data.get("segment_texts")
 
-        # If still too long, truncate the text itself
-        if len(transcript_text) > max_chars:
-            transcript_text = transcript_text[:max_chars] + '..."}'
+        if segment_texts:
+            # Already sampled from beginning, middle and end by the query
+            transcript_text = "\n".join(
+                text for text in (str(t).strip() for t in segment_texts) if text
+            )
+        else:
+            transcript_text = (result_data.get("text") or "").strip()
+
+        if max_tokens is None:
+            max_tokens = _transcript_token_budget()
+        # A token is at least one character, so short transcripts need no encoding
+        if len(transcript_text) > max_tokens:
+            encoding = _get_encoding()
+            tokens = encoding.encode(transcript_text)
+            if len(tokens) > max_tokens:
+                transcript_text = encoding.decode(tokens[:max_tokens])
 
         return transcript_text
 
     @staticmethod
-    def _generate_tags_with_openai(result_data: Dict) -> Dict[str, List[str]]:
-        """Generate tags using OpenAI."""
+    def _generate_tags_with_openai(result_data: Dict, use_cache: bool = True) -> Dict[str, List[str]]:
+        """Generate tags using OpenAI. Identical transcripts reuse the cached reply unless use_cache is False."""
+        if client is None:
+            raise ValueError("OpenAI is not configured (missing OPENAI_API_KEY)")
         try:
-            language = result_data.get("language", "es")
+            language = result_data.get("language") or "es"
 
             # Truncate to avoid context length errors
             transcript_text = TagsService._truncate_for_context(result_data)
 
-            language_names = {
-                "es": "Spanish", "en": "English", "pt": "Portuguese",
-                "fr": "French", "de": "German"
-            }
-            language_name = language_names.get(language, "Spanish")
+            language_name = _LANGUAGE_NAMES.get(language, "Spanish")
+            user_content = f"Tags language: {language_name}\n\nTranscript:\n{transcript_text}"
 
-            prompt = f"""
-Generate max 5 tags that summarize the call center transcript in {language_name}.
-Also include extra tags for key topics.
-Tags must be in SCREAMING_SNAKE_CASE (e.g., TAG_NAME) in {language_name}.
-
-Return ONLY JSON:
-{{
-  "tags": ["TAG_1", "TAG_2"],
-  "extraTags": ["EXTRA_TAG_1"]
-}}
-"""
+            key = llm_cache.cache_key(settings.TAGS_MODEL, _SYSTEM_PROMPT, user_content)
+            if use_cache:
+                cached = llm_cache.get(key)
+                if cached is not None:
+                    return cached
 
             response = client.chat.completions.create(
-                model="gpt-4o-mini",
+                model=settings.TAGS_MODEL,
                 messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": transcript_text}
+                    {"role": "system", "content": _SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content}
                 ],
-                response_format={"type": "json_object"},
+                tools=[_TAGS_TOOL],
+                tool_choice={"type": "function", "function": {"name": "emit_tags"}},
                 temperature=0.2
             )
 
-            tags_data = json.loads(response.choices[0].message.content)
-            tags_data.setdefault("tags", [])
-            tags_data.setdefault("extraTags", [])
+            details = response.usage.prompt_tokens_details if response.usage else None
+            logger.debug(f"Tags prompt tokens: {response.usage.prompt_tokens if response.usage else None}, "
+                         f"cached: {details.cached_tokens if details else None}")
+
+            tags_data = orjson.loads(response.choices[0].message.tool_calls[0].function.arguments)
+            llm_cache.set(key, tags_data)
             return tags_data
 
         except Exception as e:
@@ -151,11 +303,5 @@ Return ONLY JSON:
     @staticmethod
     def _save_tags(db: Session, task_uuid: str, tags_data: Dict[str, List[str]]):
         """Save tags to database."""
-        query = text("""
-            INSERT INTO generated_tags (uuid, tags, created_at)
-            VALUES (:uuid, :tags, NOW())
-            ON CONFLICT (uuid) DO UPDATE
-            SET tags = :tags
-        """)
-        db.execute(query, {"uuid": task_uuid, "tags": json.dumps(tags_data)})
+        db.execute(_SAVE_TAGS_STMT, {"uuid": task_uuid, "tags": orjson.dumps(tags_data).decode()})
         db.commit()
@@ -3,10 +3,42 @@ AuditorIA External API - Python SDK Example
 Complete integration example for external clients.
 """
 
+import mimetypes
+import os
 import requests
+import shutil
+import threading
 import time
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, List, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # Optional: parses large task results several times faster than stdlib json
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: streams multipart uploads instead of building the body in memory
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
+try:
+    # Optional: HTTP/2 transport for AuditorIAClientHTTP2 (pip install "httpx[http2]")
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Task statuses that never change again. 'completed' is not one of them: an
+# audit moves the task on to 'audited'.
+_FINAL_STATUSES = ('audited', 'failed')
 
 
 class AuditorIAClient:
@@ -22,9 +54,90 @@ class AuditorIAClient:
         """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-        self.headers = {
-            'X-API-Key': api_key
-        }
+
+        # Endpoint URLs, built once instead of formatted on every call
+        self._url_upload = self.base_url + "/upload/"
+        self._url_tasks = self.base_url + "/tasks/"
+        self._url_tasks_bulk = self.base_url + "/tasks/bulk"
+        self._url_task = self.base_url + "/tasks/%s"
+        self._url_audio = self.base_url + "/tasks/%s/audio"
+        self._url_chat = self.base_url + "/tasks/%s/chat"
+        self._url_agent_identification = self.base_url + "/agent-identification/%s"
+        self._url_speaker_analysis = self.base_url + "/speaker-analysis/%s"
+        self._url_tags = self.base_url + "/tags/%s"
+        self._url_audit = self.base_url + "/audit/generate"
+        self._url_report_tasks = self.base_url + "/reports/tasks"
+        self._url_report_audits = self.base_url + "/reports/audits"
+        self._url_report_summary = self.base_url + "/reports/summary"
+        self._url_campaigns = self.base_url + "/campaigns/"
+
+        # One session per thread, created on first use: threads sharing this
+        # client never contend on one session's pool or cookie state.
+        self._local = threading.local()
+        self._sessions: List[Any] = []
+        self._sessions_lock = threading.Lock()
+
+        # In-process cache for idempotent GETs: url -> (expires_at, data).
+        # Tasks in a final status never change, so they are kept with no expiry.
+        self._cache: Dict[str, tuple] = {}
+
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's session."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._make_session(self.api_key)
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    @staticmethod
+    def _make_session(api_key: str) -> requests.Session:
+        # A pooled keep-alive session (no TCP/TLS handshake per request);
+        # idempotent requests are retried on 502/503/504.
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'X-API-Key': api_key})
+        return session
+
+    def _cache_get(self, key: str) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry and (entry[0] is None or entry[0] > time.monotonic()):
+            return entry[1]
+        return None
+
+    def _cache_set(self, key: str, data: Any, ttl: Optional[float]) -> None:
+        self._cache[key] = (None if ttl is None else time.monotonic() + ttl, data)
+
+    @staticmethod
+    def _json(response: requests.Response) -> Any:
+        """Decode a JSON response body, with orjson when it is installed."""
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    def invalidate(self, task_uuid: str) -> None:
+        """Drop a cached task."""
+        self._cache.pop(self._url_task % task_uuid, None)
+
+    def close(self) -> None:
+        """Release the connection pools of every thread's session."""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
+    def __enter__(self) -> "AuditorIAClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     # ==================== UPLOAD ====================
 
@@ -53,10 +166,9 @@ class AuditorIAClient:
         Returns:
             dict: {"task_id": "uuid", "status": "queued", "message": "..."}
         """
-        url = f"{self.base_url}/upload/"
+        url = self._url_upload
 
         with open(file_path, 'rb') as f:
-            files = {'file': f}
             data = {
                 'campaign_id': campaign_id,
                 'username': username,
@@ -66,25 +178,39 @@ class AuditorIAClient:
                 'device': device
             }
 
-            response = requests.post(
-                url,
-                headers=self.headers,
-                files=files,
-                data=data
-            )
+            if MultipartEncoder is not None:
+                # Read from disk as the body is sent: memory stays flat
+                # regardless of the recording's size
+                file_name = os.path.basename(file_path)
+                content_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+                encoder = MultipartEncoder(fields={
+                    **{key: str(value) for key, value in data.items()},
+                    'file': (file_name, f, content_type)
+                })
+                response = self.session.post(
+                    url,
+                    data=encoder,
+                    headers={'Content-Type': encoder.content_type}
+                )
+            else:
+                response = self.session.post(
+                    url,
+                    files={'file': f},
+                    data=data
+                )
             response.raise_for_status()
-            return response.json()
+            return self._json(response)
 
     # ==================== TASKS ====================
 
     def list_tasks(self, skip: int = 0, limit: int = 10) -> List[Dict]:
         """Get list of tasks."""
-        url = f"{self.base_url}/tasks/"
+        url = self._url_tasks
         params = {'skip': skip, 'limit': limit}
 
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, params=params)
         response.raise_for_status()
-        return response.json()
+        return self._json(response)
 
     def get_task(self, task_uuid: str) -> Dict[str, Any]:
         """
@@ -96,25 +222,38 @@ class AuditorIAClient:
         Returns:
             dict: Task details with status, result, metadata, error
         """
-        url = f"{self.base_url}/tasks/{task_uuid}"
+        url = self._url_task % task_uuid
+        cached = self._cache_get(url)
+        if cached is not None:
+            return cached
 
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
-        return response.json()
+        data = self._json(response)
+        if data.get('status') in _FINAL_STATUSES:
+            self._cache_set(url, data, ttl=None)
+        return data
 
     def wait_for_task(
         self,
         task_uuid: str,
         timeout: int = 600,
-        poll_interval: int = 5
+        initial_interval: float = 0.5,
+        max_interval: float = 10.0,
+        backoff_factor: float = 1.5
     ) -> Dict[str, Any]:
         """
         Poll task status until completion or timeout.
 
+        Polls quickly at first (short tasks are picked up sooner) and backs off
+        exponentially up to max_interval (long tasks cost fewer requests).
+
         Args:
             task_uuid: Task UUID
             timeout: Maximum wait time in seconds (default: 600)
-            poll_interval: Seconds between polls (default: 5)
+            initial_interval: Seconds before the second poll (default: 0.5)
+            max_interval: Maximum seconds between polls (default: 10)
+            backoff_factor: Interval multiplier after each poll (default: 1.5)
 
         Returns:
             dict: Final task data
@@ -124,6 +263,7 @@ class AuditorIAClient:
             Exception: If task fails
         """
         start_time = time.time()
+        interval = initial_interval
 
         while True:
             elapsed = time.time() - start_time
@@ -133,14 +273,115 @@ class AuditorIAClient:
             task_data = self.get_task(task_uuid)
             status = task_data['status']
 
-            if status == 'completed':
+            if status in ('completed', 'audited'):
                 return task_data
             elif status == 'failed':
                 error = task_data.get('error', 'Unknown error')
                 raise Exception(f"Task failed: {error}")
 
-            print(f"Task {task_uuid} status: {status}, waiting {poll_interval}s...")
-            time.sleep(poll_interval)
+            logger.debug("Task %s status: %s, waiting %.1fs...", task_uuid, status, interval)
+            time.sleep(interval)
+            interval = min(max_interval, interval * backoff_factor)
+
+    def _get_task_or_none(self, task_uuid: str) -> Optional[Dict[str, Any]]:
+        """get_task, with None for an unknown task instead of an HTTPError."""
+        try:
+            return self.get_task(task_uuid)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def get_tasks_bulk(self, task_uuids: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        Get several tasks in one request per 100 UUIDs.
+
+        Falls back to concurrent get_task calls on servers without /tasks/bulk.
+
+        Args:
+            task_uuids: Task UUIDs
+            max_workers: Concurrent requests in the fallback (default: 8)
+
+        Returns:
+            dict: Task details keyed by task UUID; unknown UUIDs are omitted
+        """
+        results = {}
+        missing = []
+        for task_uuid in task_uuids:
+            cached = self._cache_get(self._url_task % task_uuid)
+            if cached is not None:
+                results[task_uuid] = cached
+            else:
+                missing.append(task_uuid)
+
+        for i in range(0, len(missing), 100):
+            chunk = missing[i:i + 100]
+            response = self.session.post(self._url_tasks_bulk, json={'uuids': chunk})
+            if response.status_code in (404, 405):
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    fetched = pool.map(self._get_task_or_none, missing[i:])
+                    results.update(
+                        (task_uuid, data) for task_uuid, data in zip(missing[i:], fetched, strict=True)
+                        if data is not None
+                    )
+                break
+            response.raise_for_status()
+            for task_uuid, data in self._json(response).items():
+                if data.get('status') in _FINAL_STATUSES:
+                    self._cache_set(self._url_task % task_uuid, data, ttl=None)
+                results[task_uuid] = data
+        return results
+
+    def wait_for_tasks(
+        self,
+        task_uuids: List[str],
+        timeout: int = 600,
+        initial_interval: float = 0.5,
+        max_interval: float = 10.0,
+        backoff_factor: float = 1.5
+    ) -> List[Dict[str, Any]]:
+        """
+        Poll several tasks until all complete, with one bulk request per poll.
+
+        Args:
+            task_uuids: Task UUIDs
+            timeout: Maximum wait time in seconds (default: 600)
+            initial_interval: Seconds before the second poll (default: 0.5)
+            max_interval: Maximum seconds between polls (default: 10)
+            backoff_factor: Interval multiplier after each poll (default: 1.5)
+
+        Returns:
+            list: Final task data, in the same order as task_uuids
+
+        Raises:
+            TimeoutError: If the tasks don't complete in time
+            Exception: If a task fails or does not exist
+        """
+        start_time = time.time()
+        interval = initial_interval
+        completed: Dict[str, Dict[str, Any]] = {}
+
+        while True:
+            pending = [u for u in task_uuids if u not in completed]
+            tasks = self.get_tasks_bulk(pending)
+            for task_uuid in pending:
+                task_data = tasks.get(task_uuid)
+                if task_data is None:
+                    raise Exception(f"Task {task_uuid} not found")
+                if task_data['status'] in ('completed', 'audited'):
+                    completed[task_uuid] = task_data
+                elif task_data['status'] == 'failed':
+                    error = task_data.get('error', 'Unknown error')
+                    raise Exception(f"Task {task_uuid} failed: {error}")
+
+            if len(completed) == len(set(task_uuids)):
+                return [completed[u] for u in task_uuids]
+            if time.time() - start_time > timeout:
+                raise TimeoutError(f"Tasks did not complete in {timeout}s")
+
+            logger.debug("%d/%d tasks completed, waiting %.1fs...", len(completed), len(set(task_uuids)), interval)
+            time.sleep(interval)
+            interval = min(max_interval, interval * backoff_factor)
 
     def download_audio(self, task_uuid: str, output_path: str) -> None:
         """
@@ -150,21 +391,24 @@ class AuditorIAClient:
             task_uuid: Task UUID
             output_path: Where to save the audio file
         """
-        url = f"{self.base_url}/tasks/{task_uuid}/audio"
+        url = self._url_audio % task_uuid
 
-        response = requests.get(url, headers=self.headers, stream=True)
+        response = self.session.get(url, stream=True)
         response.raise_for_status()
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        # Copy the raw stream in 128 KiB blocks: far fewer Python iterations and
+        # write syscalls per MB than iter_content's 8 KiB chunks
+        response.raw.decode_content = True
+        with open(output_path, 'wb', buffering=1024 * 1024) as f:
+            shutil.copyfileobj(response.raw, f, length=128 * 1024)
 
     def delete_task(self, task_uuid: str) -> None:
         """Delete a task."""
-        url = f"{self.base_url}/tasks/{task_uuid}"
+        url = self._url_task % task_uuid
 
-        response = requests.delete(url, headers=self.headers)
+        response = self.session.delete(url)
         response.raise_for_status()
+        self.invalidate(task_uuid)
 
     # ==================== ANALYSIS ====================
 
@@ -178,11 +422,11 @@ class AuditorIAClient:
         Returns:
             dict: {"SPEAKER_00": "Agente", "SPEAKER_01": "Cliente"}
         """
-        url = f"{self.base_url}/agent-identification/{task_uuid}"
+        url = self._url_agent_identification % task_uuid
 
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
-        data = response.json()
+        data = self._json(response)
         return data['identification']
 
     def get_speaker_analysis(
@@ -200,12 +444,12 @@ class AuditorIAClient:
         Returns:
             dict: {"SPEAKER_00": "Analysis text...", ...}
         """
-        url = f"{self.base_url}/speaker-analysis/{task_uuid}"
+        url = self._url_speaker_analysis % task_uuid
         params = {'generate_new': generate_new}
 
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, params=params)
         response.raise_for_status()
-        data = response.json()
+        data = self._json(response)
         return data['analysis']
 
     def get_tags(
@@ -223,12 +467,12 @@ class AuditorIAClient:
         Returns:
             dict: {"tags": [...], "extraTags": [...]}
         """
-        url = f"{self.base_url}/tags/{task_uuid}"
+        url = self._url_tags % task_uuid
         params = {'generate_new': generate_new}
 
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, params=params)
         response.raise_for_status()
-        return response.json()
+        return self._json(response)
 
     # ==================== AI CHAT ====================
 
@@ -243,16 +487,12 @@ class AuditorIAClient:
         Returns:
             str: AI response
         """
-        url = f"{self.base_url}/tasks/{task_uuid}/chat"
+        url = self._url_chat % task_uuid
         payload = {'chat_input': message}
 
-        response = requests.post(
-            url,
-            headers={**self.headers, 'Content-Type': 'application/json'},
-            json=payload
-        )
+        response = self.session.post(url, json=payload)
         response.raise_for_status()
-        return response.json()['response']
+        return self._json(response)['response']
 
     def get_chat_history(self, task_uuid: str) -> List[Dict]:
         """
@@ -264,11 +504,11 @@ class AuditorIAClient:
         Returns:
             list: Chat messages
         """
-        url = f"{self.base_url}/tasks/{task_uuid}/chat"
+        url = self._url_chat % task_uuid
 
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
-        return response.json()['messages']
+        return self._json(response)['messages']
 
     # ==================== AUDIT ====================
 
@@ -287,58 +527,144 @@ class AuditorIAClient:
         Returns:
             dict: Audit results with score, failures, detailed answers
         """
-        url = f"{self.base_url}/audit/generate"
+        url = self._url_audit
         payload = {
             'task_uuid': task_uuid,
             'is_call': is_call
         }
 
-        response = requests.post(
-            url,
-            headers={**self.headers, 'Content-Type': 'application/json'},
-            json=payload
-        )
+        response = self.session.post(url, json=payload)
         response.raise_for_status()
-        return response.json()
+        # The audit moves the task to 'audited'; drop any cached copy
+        self.invalidate(task_uuid)
+        return self._json(response)
 
     # ==================== REPORTS ====================
 
     def get_task_stats(self, days: int = 30) -> Dict[str, Any]:
         """Get task statistics for the last N days."""
-        url = f"{self.base_url}/reports/tasks"
+        url = self._url_report_tasks
         params = {'days': days}
 
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, params=params)
         response.raise_for_status()
-        return response.json()
+        return self._json(response)
 
     def get_audit_stats(self, days: int = 30) -> Dict[str, Any]:
         """Get audit statistics for the last N days."""
-        url = f"{self.base_url}/reports/audits"
+        url = self._url_report_audits
         params = {'days': days}
 
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, params=params)
         response.raise_for_status()
-        return response.json()
+        return self._json(response)
 
     def get_summary(self, days: int = 30) -> Dict[str, Any]:
         """Get combined task and audit summary."""
-        url = f"{self.base_url}/reports/summary"
+        url = self._url_report_summary
         params = {'days': days}
 
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.session.get(url, params=params)
         response.raise_for_status()
-        return response.json()
+        return self._json(response)
 
     # ==================== CAMPAIGNS ====================
 
     def list_campaigns(self) -> List[Dict]:
-        """Get list of available campaigns."""
-        url = f"{self.base_url}/campaigns/"
+        """Get list of available campaigns (cached for 60 seconds)."""
+        url = self._url_campaigns
+        cached = self._cache_get(url)
+        if cached is not None:
+            return cached
 
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         response.raise_for_status()
-        return response.json()
+        data = self._json(response)
+        self._cache_set(url, data, ttl=60)
+        return data
+
+
+class AuditorIAClientHTTP2(AuditorIAClient):
+    """
+    AuditorIAClient over HTTP/2, backed by httpx.
+
+    Concurrent calls from several threads (wait_for_tasks, the batch example)
+    are multiplexed as streams over a single TLS connection instead of each
+    taking its own HTTP/1.1 connection, and repeated headers are
+    HPACK-compressed. Requires: pip install "httpx[http2]"
+    """
+
+    def __init__(self, base_url: str, api_key: str):
+        super().__init__(base_url, api_key)
+        # httpx.Client is thread-safe, and multiplexing needs every thread on
+        # the same connection: share one client instead of one per thread.
+        self._client = self._make_session(api_key)
+        self._sessions.append(self._client)
+
+    @property
+    def session(self) -> "httpx.Client":
+        return self._client
+
+    def _get_task_or_none(self, task_uuid: str) -> Optional[Dict[str, Any]]:
+        """get_task, with None for an unknown task instead of an HTTPStatusError."""
+        try:
+            return self.get_task(task_uuid)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+
+    @staticmethod
+    def _make_session(api_key: str) -> "httpx.Client":
+        if httpx is None:
+            raise ImportError('AuditorIAClientHTTP2 requires httpx: pip install "httpx[http2]"')
+        return httpx.Client(
+            headers={'X-API-Key': api_key},
+            # Retries connection failures only; status codes are not retried
+            transport=httpx.HTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=10),
+                retries=3
+            ),
+            timeout=60.0
+        )
+
+    def upload_audio(
+        self,
+        file_path: str,
+        campaign_id: int,
+        username: str,
+        operator_id: int,
+        language: str = "es",
+        model: str = "nova-3",
+        device: str = "deepgram"
+    ) -> Dict[str, Any]:
+        """Upload an audio file for processing (see AuditorIAClient.upload_audio)."""
+        url = self._url_upload
+        data = {
+            'campaign_id': str(campaign_id),
+            'username': username,
+            'operator_id': str(operator_id),
+            'language': language,
+            'model': model,
+            'device': device
+        }
+
+        # httpx streams file parts from disk itself; no MultipartEncoder needed
+        with open(file_path, 'rb') as f:
+            response = self.session.post(url, files={'file': f}, data=data)
+        response.raise_for_status()
+        return self._json(response)
+
+    def download_audio(self, task_uuid: str, output_path: str) -> None:
+        """Download audio file for a task (see AuditorIAClient.download_audio)."""
+        url = self._url_audio % task_uuid
+
+        with self.session.stream('GET', url) as response:
+            response.raise_for_status()
+            with open(output_path, 'wb', buffering=1024 * 1024) as f:
+                for chunk in response.iter_bytes(chunk_size=128 * 1024):
+                    f.write(chunk)
 
 
 # ==================== USAGE EXAMPLES ====================
@@ -371,7 +697,7 @@ def example_complete_workflow():
 
     # 3. Wait for transcription to complete
     print("\n⏳ Waiting for transcription...")
-    task_data = client.wait_for_task(task_id, timeout=600, poll_interval=5)
+    task_data = client.wait_for_task(task_id, timeout=600)
     print("✅ Transcription completed!")
 
     # Print transcription
@@ -442,32 +768,34 @@ def example_batch_processing():
         "call3.mp3"
     ]
 
-    # Upload all files
-    task_ids = []
-    for audio_file in audio_files:
-        print(f"Uploading {audio_file}...")
-        result = client.upload_audio(
-            file_path=audio_file,
-            campaign_id=1,
-            username="batch_user",
-            operator_id=999
+    # Uploads, polling and audits are I/O-bound: run them concurrently over
+    # the client's connection pool instead of one file at a time.
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        # Upload all files
+        print(f"Uploading {len(audio_files)} files...")
+        results = pool.map(
+            lambda audio_file: client.upload_audio(
+                file_path=audio_file,
+                campaign_id=1,
+                username="batch_user",
+                operator_id=999
+            ),
+            audio_files
         )
-        task_ids.append(result['task_id'])
-        print(f"  → Task ID: {result['task_id']}")
-
-    # Wait for all to complete
-    completed_tasks = []
-    for task_id in task_ids:
-        print(f"\nWaiting for {task_id}...")
-        task_data = client.wait_for_task(task_id)
-        completed_tasks.append(task_data)
-        print(f"  ✅ Completed")
-
-    # Generate audits for all
-    print("\n📊 Generating audits...")
-    for task_id in task_ids:
-        audit = client.generate_audit(task_id)
-        print(f"{task_id}: Score {audit['score']}%")
+        task_ids = []
+        for audio_file, result in zip(audio_files, results, strict=True):
+            task_ids.append(result['task_id'])
+            print(f"  {audio_file} → Task ID: {result['task_id']}")
+
+        # Wait for all to complete
+        print("\nWaiting for all tasks...")
+        completed_tasks = client.wait_for_tasks(task_ids)
+        print(f"  ✅ {len(completed_tasks)} completed")
+
+        # Generate audits for all
+        print("\n📊 Generating audits...")
+        for task_id, audit in zip(task_ids, pool.map(client.generate_audit, task_ids), strict=True):
+            print(f"{task_id}: Score {audit['score']}%")
 
 
 def example_monitoring():
@@ -1,9 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
-from unittest.mock import MagicMock
+import io
 import sys
 import os
 
@@ -22,20 +22,56 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Create a fresh database session for each test."""
+# pysqlite manages transactions itself and breaks SAVEPOINT; let SQLAlchemy
+# emit BEGIN instead
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(engine, "begin")
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+@pytest.fixture(scope="session")
+def db_schema():
+    """Create the schema and seed the mock API key once per test run."""
     Base.metadata.create_all(bind=engine)
-    session = TestingSessionLocal()
+    with TestingSessionLocal() as session:
+        session.add(GlobalApiKey(
+            name="Test Key",
+            hashed_key="mock_hash",
+            prefix="mock_prefix",
+            is_active=True
+        ))
+        session.commit()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="function")
+def db_session(db_schema):
+    """
+    Database session for one test. Everything runs inside an outer transaction
+    that is rolled back afterwards; commits only release SAVEPOINTs.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
+
+@pytest.fixture(scope="session")
+def app_client():
+    """One TestClient (and one app startup/shutdown) for the whole test run."""
+    with TestClient(app) as c:
+        yield c
 
 @pytest.fixture(scope="function")
-def client(db_session):
-    """Create a test client with overridden dependencies."""
+def client(app_client, db_session):
+    """Test client with dependencies overridden for this test's session."""
     
     # Override get_db
     def override_get_db():
@@ -44,16 +80,8 @@ def client(db_session):
         finally:
             pass
             
-    # Create a mock API key in the DB
-    mock_key = GlobalApiKey(
-        name="Test Key",
-        hashed_key="mock_hash",
-        prefix="mock_prefix",
-        is_active=True
-    )
-    db_session.add(mock_key)
-    db_session.commit()
-    db_session.refresh(mock_key)
+    # Mock API key seeded by db_schema
+    mock_key = db_session.query(GlobalApiKey).filter_by(hashed_key="mock_hash").one()
     
     # Override get_api_key
     def override_get_api_key():
@@ -62,27 +90,24 @@ def client(db_session):
     app.dependency_overrides[get_db] = override_get_db
     app.dependency_overrides[get_api_key] = override_get_api_key
     
-    with TestClient(app) as c:
-        yield c
+    yield app_client
         
     app.dependency_overrides = {}
 
 @pytest.fixture
 def mock_s3(monkeypatch):
-    """Mock S3 service functions."""
-    mock_get_object = MagicMock()
-    # Default behavior: return an object with a body
-    mock_body = MagicMock()
-    mock_body.read.return_value = b"fake audio content"
-    # Make body iterable for StreamingResponse
-    def iter_content():
-        yield b"fake audio content"
-    mock_body.__iter__ = iter_content
-    
-    mock_get_object.return_value = {
-        'Body': mock_body,
-        'ContentType': 'audio/mpeg'
-    }
-    
-    monkeypatch.setattr("app.services.s3_service.get_s3_object", mock_get_object)
-    return mock_get_object
+    """
+    Mock S3 object lookups with a real in-memory body.
+    Returns the list of (bucket_name, object_name) lookups made.
+    """
+    calls = []
+
+    def fake_get_object(bucket_name, object_name):
+        calls.append((bucket_name, object_name))
+        return {
+            'Body': io.BytesIO(b"fake audio content"),
+            'ContentType': 'audio/mpeg'
+        }
+
+    monkeypatch.setattr("app.services.s3_service.get_s3_object_if_exists", fake_get_object)
+    return calls
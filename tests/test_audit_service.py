@@ -0,0 +1,44 @@
+from app.services.audit_service import AuditService
+
+CRITERIA = [
+    {"id": 1, "question": "Saludo", "target_score": 10},
+    {"id": 2, "question": "Cierre", "target_score": 10},
+]
+
+def test_calculate_score_matches_by_id():
+    answers = [
+        {"id": 1, "question": "Otro nombre", "score": 10},
+        {"id": 2, "question": "Cierre", "score": 5},
+    ]
+    score, is_failure = AuditService._calculate_score(answers, CRITERIA, 70.0)
+    assert score == 75.0
+    assert is_failure is False
+
+def test_calculate_score_matches_string_ids():
+    answers = [
+        {"id": "1", "question": "Otro nombre", "score": 10},
+        {"id": "2", "question": "Otro más", "score": 10},
+    ]
+    score, is_failure = AuditService._calculate_score(answers, CRITERIA, 70.0)
+    assert score == 100.0
+    assert is_failure is False
+
+def test_calculate_score_falls_back_to_question():
+    answers = [
+        {"question": "Saludo", "score": 4},
+        {"id": 99, "question": "Cierre", "score": 6},
+    ]
+    score, is_failure = AuditService._calculate_score(answers, CRITERIA, 70.0)
+    assert score == 50.0
+    assert is_failure is True
+
+def test_calculate_score_ignores_answers_outside_campaign(caplog):
+    answers = [
+        {"id": 1, "question": "Saludo", "score": 10},
+        {"id": 2, "question": "Cierre", "score": 10},
+        {"id": 3, "question": "Inventado", "score": 10},
+    ]
+    score, is_failure = AuditService._calculate_score(answers, CRITERIA, 70.0)
+    assert score == 100.0
+    assert is_failure is False
+    assert "match no campaign criterion: [3]" in caplog.text
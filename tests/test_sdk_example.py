@@ -0,0 +1,64 @@
+import httpx
+import orjson
+import requests
+
+from python_sdk_example import AuditorIAClient, AuditorIAClientHTTP2
+
+
+class FakeSession:
+    """Serves task statuses from a dict and counts GET requests."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.gets = 0
+
+    @staticmethod
+    def _response(status_code, data):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = orjson.dumps(data)
+        return response
+
+    def get(self, url, **kwargs):
+        self.gets += 1
+        task_uuid = url.rsplit("/", 1)[-1]
+        return self._response(200, {"status": self.statuses[task_uuid]})
+
+    def post(self, url, json=None, **kwargs):
+        # Auditing a task moves it from 'completed' to 'audited'
+        self.statuses[json["task_uuid"]] = "audited"
+        return self._response(200, {"success": True, "task_uuid": json["task_uuid"]})
+
+    def close(self):
+        pass
+
+
+def test_get_task_refreshed_after_audit(monkeypatch):
+    session = FakeSession({"task-1": "completed"})
+    monkeypatch.setattr(AuditorIAClient, "_make_session", staticmethod(lambda api_key: session))
+    client = AuditorIAClient("http://api.test", "key")
+
+    assert client.get_task("task-1")["status"] == "completed"
+    client.generate_audit("task-1")
+    assert client.get_task("task-1")["status"] == "audited"
+    assert session.gets == 2
+
+    # 'audited' is final: served from the cache
+    assert client.get_task("task-1")["status"] == "audited"
+    assert session.gets == 2
+
+
+def test_http2_get_tasks_bulk_fallback_skips_unknown_tasks(monkeypatch):
+    def handler(request):
+        if request.url.path == "/tasks/bulk":
+            # Server without the bulk route
+            return httpx.Response(405)
+        if request.url.path == "/tasks/task-1":
+            return httpx.Response(200, json={"status": "audited"})
+        return httpx.Response(404, json={"detail": "Task not found"})
+
+    session = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(AuditorIAClientHTTP2, "_make_session", staticmethod(lambda api_key: session))
+    client = AuditorIAClientHTTP2("http://api.test", "key")
+
+    assert client.get_tasks_bulk(["task-1", "unknown"]) == {"task-1": {"status": "audited"}}
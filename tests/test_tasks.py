@@ -61,10 +61,51 @@ def test_get_task_detail(client: TestClient, db_session: Session):
     assert data["metadata"]["file_name"] == "detail_test.mp3"
     assert data["metadata"]["url"] == "s3_path/detail_test.mp3"
 
+def test_get_task_detail_gzip(client: TestClient, db_session: Session):
+    api_key = db_session.query(GlobalApiKey).first()
+    task_uuid = str(uuid.uuid4())
+    segments = [{"start": i, "end": i + 1, "text": "Hola, ¿cómo estás?"} for i in range(100)]
+
+    task = Task(
+        uuid=task_uuid,
+        status="completed",
+        task_type="transcription",
+        result={"segments": segments},
+        task_params={"api_key_id": api_key.id}
+    )
+    db_session.add(task)
+    db_session.commit()
+
+    response = client.get(f"/tasks/{task_uuid}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["result"]["segments"]) == 100
+
 def test_get_task_not_found(client: TestClient):
     response = client.get("/tasks/non-existent-uuid")
     assert response.status_code == 404
 
+def test_get_tasks_bulk(client: TestClient, db_session: Session):
+    api_key = db_session.query(GlobalApiKey).first()
+    task_uuids = [str(uuid.uuid4()) for _ in range(2)]
+
+    for task_uuid in task_uuids:
+        db_session.add(Task(
+            uuid=task_uuid,
+            status="completed",
+            task_type="transcription",
+            file_name=f"{task_uuid}.mp3",
+            task_params={"api_key_id": api_key.id}
+        ))
+    db_session.commit()
+
+    response = client.post("/tasks/bulk", json={"uuids": task_uuids + ["non-existent-uuid"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == set(task_uuids)
+    assert data[task_uuids[0]]["status"] == "completed"
+    assert data[task_uuids[0]]["metadata"]["file_name"] == f"{task_uuids[0]}.mp3"
+
 def test_delete_task(client: TestClient, db_session: Session):
     api_key = db_session.query(GlobalApiKey).first()
     task_uuid = str(uuid.uuid4())
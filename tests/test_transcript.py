@@ -0,0 +1,13 @@
+from app.core.transcript import sample_segments
+
+def test_sample_segments_short_transcript_unchanged():
+    segments = list(range(100))
+    assert sample_segments(segments) is segments
+
+def test_sample_segments_head_middle_tail():
+    segments = list(range(1000))
+    sampled = sample_segments(segments)
+    assert len(sampled) == 100
+    assert sampled[:40] == list(range(40))
+    assert sampled[40:60] == list(range(490, 510))
+    assert sampled[60:] == list(range(960, 1000))